@@ -0,0 +1,234 @@
+"""
+This module rebuilds the timeline of the record changes of the World Athletics Records project from the git history.
+
+Every daily run commits the scraped records, so each commit that touched 'data/data_before' or 'data/data_after' holds a snapshot
+of the 16 CSV files. The snapshots are read straight from the git object store, without checking anything out:
+1. A single 'git log --raw' lists, for every such commit, the blob ID of each CSV file it changed, from which the snapshot of each
+   commit is tracked incrementally. The daily commit is made after sync_folders, so a file is taken from 'data/data_after' when
+   present there and from 'data/data_before' otherwise.
+2. Consecutive identical snapshots are skipped and only the files whose blob changed are compared, so each distinct blob is read
+   once, by a single 'git cat-file --batch' process.
+3. The pairs of blobs are split in one batch per process of a process pool, and each batch is compared with a single vectorized
+   call to data_analysis.diff_records, keyed on the pair.
+
+The result is one compact Arrow file (dictionary-encoded, zstd-compressed) with one row per record change and the commit, date,
+sex and category it belongs to. The first snapshot is recorded as 'added' records, so the timeline is complete.
+
+Functions:
+- snapshot_commits(repo, folders): Lists the commits that changed the records and the blob of each CSV file after each of them.
+- read_blobs(repo, blob_ids): Reads the content of blobs from the git object store.
+- build_timeline(repo, workers): Returns the timeline of the record changes as a DataFrame.
+- write_timeline(timeline, path), read_timeline(path): Write and read the timeline file.
+
+Usage:
+    python backfill.py [--repo PATH] [--output data/history/timeline.arrow] [--workers N]
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import concurrent.futures
+from datetime import datetime, timezone
+import io
+import logging
+import os
+import subprocess
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from data_analysis import RECORD_COLUMNS, VALUE_COLUMNS, diff_records
+from log_setup import setup_logging
+
+############################################################################################################
+
+SNAPSHOT_FOLDERS = ['data/data_after', 'data/data_before']
+TIMELINE_PATH = 'data/history/timeline.arrow'
+TIMELINE_COLUMNS = (['COMMIT', 'TIMESTAMP', 'SEX', 'CATEGORY', 'CHANGE_TYPE', 'DISCIPLINE', 'OCCURRENCE']
+                    + [f'{col}_before' for col in VALUE_COLUMNS] + [f'{col}_after' for col in VALUE_COLUMNS])
+NULL_BLOB = '0' * 40
+
+############################################################################################################
+
+def snapshot_commits(repo: str = '.', folders: list = SNAPSHOT_FOLDERS) -> list:
+    """
+    Lists the commits of the first-parent history that changed a records CSV file, with the blob of each file after each of them.
+
+    Parameters:
+        - repo (str): Path of the git repository.
+        - folders (list): Snapshot folders, by order of precedence when a file is present in several of them.
+
+    Returns:
+        - list: One (commit, timestamp, snapshot) tuple per commit, oldest first, the snapshot mapping each partition name
+          (e.g. 'men_world') to the ID of its blob.
+    """
+    log = subprocess.run(['git', '-C', repo, 'log', '--reverse', '--first-parent', '--diff-merges=first-parent', '--raw',
+                          '--no-abbrev', '--no-renames', '--format=%x00%H %ct', '--', *folders],
+                         check=True, capture_output=True, text=True).stdout
+
+    trees = {folder: {} for folder in folders}
+    commits = []
+    for entry in log.split('\0')[1:]:
+        header, *changes = entry.strip('\n').split('\n')
+        commit, timestamp = header.split()
+        for line in changes:
+            if not line.startswith(':'):
+                continue
+            info, path = line.split('\t', 1)
+            folder, filename = os.path.split(path)
+            if folder not in trees or not filename.endswith('_records.csv'):
+                continue
+            blob = info.split()[3]
+            if blob == NULL_BLOB:
+                trees[folder].pop(filename, None)
+            else:
+                trees[folder][filename] = blob
+
+        snapshot = {}
+        for folder in reversed(folders):
+            snapshot.update({filename[:-len('_records.csv')]: blob for filename, blob in trees[folder].items()})
+        commits.append((commit, datetime.fromtimestamp(int(timestamp), timezone.utc).isoformat(), snapshot))
+    return commits
+
+
+def read_blobs(repo: str, blob_ids: list) -> dict:
+    """
+    Reads the content of blobs from the git object store with a single 'git cat-file --batch' process.
+
+    Parameters:
+        - repo (str): Path of the git repository.
+        - blob_ids (list): IDs of the blobs.
+
+    Returns:
+        - dict: A mapping from blob ID to content (bytes).
+    """
+    blob_ids = list(blob_ids)
+    output = subprocess.run(['git', '-C', repo, 'cat-file', '--batch'], input=''.join(f'{blob}\n' for blob in blob_ids).encode(),
+                            check=True, capture_output=True).stdout
+
+    blobs, position = {}, 0
+    for blob in blob_ids:
+        end = output.index(b'\n', position)
+        size = int(output[position:end].split()[2])
+        blobs[blob] = output[end + 1:end + 1 + size]
+        # Each object is followed by a newline
+        position = end + 1 + size + 1
+    return blobs
+
+
+def _records(content: bytes) -> pd.DataFrame:
+    """
+    Parses the content of a records CSV file.
+    """
+    return pd.read_csv(io.BytesIO(content))
+
+
+def _diff_batch(pairs: list, blobs: dict) -> pd.DataFrame:
+    """
+    Compares a batch of pairs of blobs in a single call to data_analysis.diff_records, each distinct blob being parsed once.
+
+    Parameters:
+        - pairs (list): (pair ID, blob before, blob after) tuples, a missing file having None as blob.
+        - blobs (dict): Content of the blobs, by ID.
+
+    Returns:
+        - pd.DataFrame: The changed records of every pair, with a '_PAIR' column.
+    """
+    records = {blob: _records(content) for blob, content in blobs.items()}
+    tables = {}
+    for side, position in (('before', 1), ('after', 2)):
+        frames = [records[pair[position]].assign(_PAIR=pair[0]) for pair in pairs if pair[position] is not None]
+        tables[side] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['_PAIR', *RECORD_COLUMNS])
+    return diff_records(tables['before'], tables['after'], by=['_PAIR'])
+
+
+def build_timeline(repo: str = '.', workers: int = None) -> pd.DataFrame:
+    """
+    Returns the timeline of the record changes recorded in the git history of the repository.
+
+    Parameters:
+        - repo (str): Path of the git repository.
+        - workers (int): Number of processes comparing the snapshots. Defaults to the number of CPU cores.
+
+    Returns:
+        - pd.DataFrame: One row per record change, oldest first, with the TIMELINE_COLUMNS columns.
+    """
+    commits = snapshot_commits(repo)
+
+    # Every file that changed between two distinct snapshots
+    pairs, previous = [], {}
+    for commit, timestamp, snapshot in commits:
+        for partition in sorted(previous.keys() | snapshot.keys()):
+            if previous.get(partition) != snapshot.get(partition):
+                pairs.append({'_PAIR': len(pairs), 'COMMIT': commit, 'TIMESTAMP': timestamp, 'PARTITION': partition,
+                              'before': previous.get(partition), 'after': snapshot.get(partition)})
+        previous = snapshot
+    logging.info(f"{len(commits)} commits, {len(pairs)} changed files to compare.")
+    if not pairs:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS)
+
+    blobs = read_blobs(repo, {pair[side] for pair in pairs for side in ('before', 'after') if pair[side] is not None})
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pairs)))
+    # Consecutive pairs share blobs, so contiguous batches keep the number of blobs parsed by more than one process low
+    batches = [[(pair['_PAIR'], pair['before'], pair['after']) for pair in pairs[k * len(pairs) // workers:(k + 1) * len(pairs) // workers]]
+               for k in range(workers)]
+    batch_blobs = [{blob: blobs[blob] for pair in batch for blob in pair[1:] if blob is not None} for batch in batches]
+    if workers == 1:
+        diffs = [_diff_batch(batches[0], batch_blobs[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            diffs = list(pool.map(_diff_batch, batches, batch_blobs))
+
+    changes = pd.concat(diffs, ignore_index=True)
+    commits = pd.DataFrame(pairs).drop(columns=['before', 'after'])
+    commits[['SEX', 'CATEGORY']] = commits['PARTITION'].str.split('_', n=1, expand=True)
+    timeline = changes.merge(commits, on='_PAIR').sort_values(['_PAIR', 'DISCIPLINE', 'OCCURRENCE'], kind='stable')
+    return timeline[TIMELINE_COLUMNS].reset_index(drop=True)
+
+
+def write_timeline(timeline: pd.DataFrame, path: str = TIMELINE_PATH) -> None:
+    """
+    Writes the timeline as an Arrow file, with dictionary-encoded text columns and zstd compression. The file is replaced
+    atomically.
+
+    Parameters:
+        - timeline (pd.DataFrame): The timeline, as returned by build_timeline.
+        - path (str): Path of the file.
+    """
+    table = pa.Table.from_pandas(timeline.astype({col: 'string' for col in timeline.columns if col != 'OCCURRENCE'}),
+                                 preserve_index=False)
+    table = pa.table([column.dictionary_encode() if pa.types.is_string(column.type) else column for column in table.columns],
+                     names=table.column_names)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    feather.write_feather(table, f'{path}.tmp', compression='zstd')
+    os.replace(f'{path}.tmp', path)
+
+
+def read_timeline(path: str = TIMELINE_PATH) -> pd.DataFrame:
+    """
+    Reads a timeline file written by write_timeline, with missing values as None.
+
+    Parameters:
+        - path (str): Path of the file.
+
+    Returns:
+        - pd.DataFrame: The timeline.
+    """
+    timeline = feather.read_table(path).to_pandas()
+    return timeline.astype({col: object for col in timeline.columns if col != 'OCCURRENCE'})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the timeline of the record changes from the git history.")
+    parser.add_argument("--repo", default=".", help="Path of the git repository.")
+    parser.add_argument("--output", default=TIMELINE_PATH, help="Path of the timeline file.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: number of cores).")
+    args = parser.parse_args()
+    setup_logging()
+
+    timeline = build_timeline(args.repo, args.workers)
+    write_timeline(timeline, args.output)
+    logging.info(f"{len(timeline)} record changes written to {args.output}.")
+    print(f"{len(timeline)} record changes written to {args.output}.")
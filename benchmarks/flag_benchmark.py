@@ -0,0 +1,79 @@
+"""
+Benchmark of the country flag lookup used in the tweet messages.
+
+Compares the former pycountry-based lookup (ISO alpha-3) with the precomputed IOC table of country_flags: the cold start of a
+process that imports the module and does one lookup, the per-lookup latency over the country codes of data/data_after, and the
+number of codes of the data for which each approach finds a flag.
+
+Usage:
+    python benchmarks/flag_benchmark.py [--repeat N]
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import timeit
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from country_flags import ioc_to_flag
+
+############################################################################################################
+
+PYCOUNTRY_LOOKUP = """
+import pycountry
+def lookup(code):
+    try:
+        country = pycountry.countries.get(alpha_3=code.upper())
+        return ''.join(chr(0x1F1E6 + ord(letter) - ord('A')) for letter in country.alpha_2)
+    except AttributeError:
+        return ''
+"""
+
+############################################################################################################
+
+def cold_start(code: str, repeat: int) -> float:
+    """
+    Returns the best wall time, in seconds, of a new Python process running `code`.
+    """
+    return min(timeit.repeat(lambda: subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True), number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the country flag lookup.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of process starts timed per approach.")
+    args = parser.parse_args()
+
+    paths = glob.glob(os.path.join(ROOT, 'data/data_after/*.csv'))
+    codes = pd.concat([pd.read_csv(path, keep_default_na=False)['COUNTRY'] for path in paths]).tolist()
+    namespace = {}
+    exec(PYCOUNTRY_LOOKUP, namespace)
+    pycountry_lookup = namespace['lookup']
+
+    pycountry_start = cold_start(PYCOUNTRY_LOOKUP + "lookup('KEN')", args.repeat)
+    table_start = cold_start("from country_flags import ioc_to_flag; ioc_to_flag('KEN')", args.repeat)
+    print(f"Process start + first lookup (best of {args.repeat}):")
+    print(f"  pycountry:     {pycountry_start * 1000:8.1f} ms")
+    print(f"  country_flags: {table_start * 1000:8.1f} ms")
+
+    print(f"\nLookup latency over the {len(codes)} codes of data/data_after:")
+    for name, lookup in (('pycountry', pycountry_lookup), ('country_flags', ioc_to_flag)):
+        elapsed = timeit.timeit(lambda: [lookup(code) for code in codes], number=10) / (10 * len(codes))
+        print(f"  {name + ':':14s} {elapsed * 1e6:8.3f} us")
+
+    unique = sorted(set(codes))
+    print(f"\nCodes with a flag among the {len(unique)} distinct codes of the data:")
+    print(f"  pycountry:     {sum(bool(pycountry_lookup(code)) for code in unique)}")
+    print(f"  country_flags: {sum(bool(ioc_to_flag(code)) for code in unique)}")
+
+if __name__ == "__main__":
+    main()
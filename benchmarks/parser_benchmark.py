@@ -0,0 +1,93 @@
+"""
+Micro-benchmark of the records table parsers used by web_scraping.create_csv.
+
+For each page, the BeautifulSoup parser and the streaming parser of records_parser are timed, and the CSV files they produce are
+checked to be byte-identical. Saved record pages (e.g. `driver.page_source` dumps) can be given on the command line; without
+arguments, a page is synthesized from each CSV file of data/data_after, with the same table markup as the World Athletics site.
+
+Usage:
+    python benchmarks/parser_benchmark.py [--repeat N] [page.html ...]
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import glob
+import html
+import os
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records_parser import TABLE_CLASS
+from web_scraping import create_csv
+
+############################################################################################################
+
+def synthetic_page(csv_path: str) -> str:
+    """
+    Builds a records page from a records CSV file, with page chrome before and a large JSON payload after the table.
+    Parsing the page back with create_csv gives the original CSV file.
+
+    Parameters:
+        - csv_path (str): Path of a records CSV file.
+
+    Returns:
+        - str: The HTML page.
+    """
+    records = pd.read_csv(csv_path, keep_default_na=False)
+    head = '<head>' + ''.join(f'<script src="/_next/static/chunks/{i}.js"></script>' for i in range(40)) + '</head>'
+    menu = '<nav>' + ''.join(f'<div class="menu"><a href="/page/{i}"><span>Item {i}</span></a></div>' for i in range(300)) + '</nav>'
+    rows = ''.join(
+        '<tr class="RecordsTable_row">'
+        f'<td>{html.escape(r.DISCIPLINE)}</td><td><span>i</span></td><td>{html.escape(r.PERF)}</td><td></td>'
+        f'<td><a href="/athletes/{i}">{html.escape(r.COMPETITOR)}</a></td><td>{html.escape(r.DOB)}</td>'
+        f'<td><img src="/flags/{r.COUNTRY}.svg"/> {html.escape(r.COUNTRY)}</td><td>{html.escape(r.VENUE + ("(i)" if r.VENUE.endswith(" ") else ""))}</td>'
+        f'<td>{html.escape(r.DATE)}</td><td></td></tr>'
+        for i, r in enumerate(records.itertuples())
+    )
+    table = (f'<table class="{TABLE_CLASS}"><thead><tr><th>Discipline</th><th>Perf</th></tr></thead>'
+             f'<tbody>{rows}</tbody></table>')
+    payload = '<script id="__NEXT_DATA__" type="application/json">' + '{"k": "' + 'x' * 200_000 + '"}</script>'
+    return f'<!DOCTYPE html><html>{head}<body><div id="__next">{menu}{table}</div>{payload}</body></html>'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the records table parsers.")
+    parser.add_argument("pages", nargs="*", help="Saved HTML record pages (default: pages synthesized from data/data_after).")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of parses timed per page and parser.")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {path: open(path, encoding='utf-8').read() for path in args.pages}
+    else:
+        pages = {path: synthetic_page(path) for path in sorted(glob.glob('data/data_after/*_records.csv'))}
+
+    totals = {'bs4': 0.0, 'stream': 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        for path, content in pages.items():
+            outputs, timings = {}, {}
+            for mode in totals:
+                csv_name = os.path.join(tmp, f'{mode}.csv')
+                timings[mode] = timeit.timeit(lambda: create_csv(content, csv_name, parser=mode), number=args.repeat) / args.repeat
+                totals[mode] += timings[mode]
+                with open(csv_name, 'rb') as f:
+                    outputs[mode] = f.read()
+            identical = outputs['bs4'] == outputs['stream']
+            print(f"{os.path.basename(path):40s} bs4 {timings['bs4'] * 1000:7.2f} ms   "
+                  f"stream {timings['stream'] * 1000:7.2f} ms   identical={identical}")
+            if not identical:
+                sys.exit(f"Output mismatch for {path}")
+
+    print(f"\nbs4:    {totals['bs4'] * 1000:8.2f} ms for {len(pages)} pages")
+    print(f"stream: {totals['stream'] * 1000:8.2f} ms for {len(pages)} pages")
+    print(f"speed-up: x{totals['bs4'] / totals['stream']:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Offline benchmark and regression check of the scrape -> diff -> tweet pipeline.
+
+Synthetic snapshots are generated from the records of data/data_after, resampled to the requested number of rows (the real
+snapshot has about 900 rows) and with a given fraction of changed records. For each snapshot, the following stages are timed:
+- parse: web_scraping.create_csv on a records page for each of the 16 CSV files (synthesized, or saved pages with --fixtures),
+- diff: data_analysis.generate_diff_dataframes between the 'before' and 'after' snapshots,
+- render: data_utils.twitter_message on the diff,
+- sync: file_operations.sync_folders from the 'after' to the 'before' snapshot.
+
+Each stage runs in a new process, and its best wall time, peak RSS and peak of traced allocations (tracemalloc) are reported.
+With --check, the results are compared to the stored baseline (benchmarks/pipeline_baseline.json) and the script fails if a stage
+is slower or uses more memory than the baseline by more than the threshold. --save-baseline stores the results as the new baseline.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--rows N ...] [--change-rates R ...] [--stages S ...] [--repeat N]
+                                            [--fixtures DIR] [--check | --save-baseline] [--threshold T]
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from file_operations import write_manifest
+from parser_benchmark import synthetic_page
+
+############################################################################################################
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'pipeline_baseline.json')
+STAGES = ['parse', 'diff', 'render', 'sync']
+METRICS = ['wall_s', 'peak_rss_mb', 'alloc_peak_mb']
+# Absolute slack under which a regression is ignored, so that very short stages do not fail on timer noise
+MIN_REGRESSION = {'wall_s': 0.005, 'peak_rss_mb': 5.0, 'alloc_peak_mb': 1.0}
+
+############################################################################################################
+
+def synthetic_snapshot(folder: str, rows: int, change_rate: float, seed: int = 0) -> None:
+    """
+    Writes a 'before' and an 'after' snapshot of about `rows` records in total, resampled from the records of data/data_after.
+    A fraction `change_rate` of the records of the 'after' snapshot get a new competitor, performance date and venue.
+
+    Parameters:
+        - folder (str): Folder in which the 'before' and 'after' snapshot folders are created.
+        - rows (int): Total number of records of a snapshot (over the 16 files).
+        - change_rate (float): Fraction of records that differ between the two snapshots.
+        - seed (int): Seed of the random generator.
+    """
+    rng = np.random.default_rng(seed)
+    paths = sorted(glob.glob(os.path.join(ROOT, 'data/data_after/*_records.csv')))
+    per_file = max(1, rows // len(paths))
+
+    for name in ('before', 'after'):
+        os.makedirs(os.path.join(folder, name))
+    for path in paths:
+        records = pd.read_csv(path, keep_default_na=False)
+        # Tiling keeps the file's disciplines in order, with each discipline repeated as many times as needed
+        before = records.iloc[np.arange(per_file) % len(records)].sort_values('DISCIPLINE', kind='stable').reset_index(drop=True)
+        after = before.copy()
+        changed = rng.random(len(after)) < change_rate
+        after.loc[changed, 'COMPETITOR'] = [f'Athlete NUMBER{i}' for i in np.flatnonzero(changed)]
+        after.loc[changed, 'DATE'] = '01 JAN 2030'
+        after.loc[changed, 'VENUE'] = 'Paris (FRA) '
+        before.to_csv(os.path.join(folder, 'before', os.path.basename(path)), index=False)
+        after.to_csv(os.path.join(folder, 'after', os.path.basename(path)), index=False)
+    for name in ('before', 'after'):
+        write_manifest(os.path.join(folder, name))
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def prepare_stage(stage: str, folder: str, fixtures: str) -> tuple:
+    """
+    Prepares the input of a stage, outside of the measured section.
+
+    Parameters:
+        - stage (str): Name of the stage.
+        - folder (str): Folder of the synthetic snapshot (see synthetic_snapshot).
+        - fixtures (str): Folder of saved HTML record pages for the parse stage, or None to synthesize them.
+
+    Returns:
+        - tuple: (run, setup), run being the measured function and setup a function called before each run.
+    """
+    before, after = os.path.join(folder, 'before'), os.path.join(folder, 'after')
+
+    if stage == 'parse':
+        from web_scraping import create_csv
+        if fixtures:
+            pages = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(fixtures, '*.html')))]
+        else:
+            pages = [synthetic_page(path) for path in sorted(glob.glob(os.path.join(after, '*_records.csv')))]
+        output = os.path.join(folder, 'parsed.csv')
+        return (lambda: [create_csv(content, output) for content in pages]), (lambda: None)
+
+    if stage == 'diff':
+        from data_analysis import generate_diff_dataframes
+        return (lambda: generate_diff_dataframes(before, after)), (lambda: None)
+
+    if stage == 'render':
+        from data_analysis import generate_diff_dataframes
+        from data_utils import twitter_message
+        df = generate_diff_dataframes(before, after)
+        return (lambda: twitter_message(df)), (lambda: None)
+
+    if stage == 'sync':
+        from file_operations import sync_folders
+        work_before, work_after = os.path.join(folder, 'sync_before'), os.path.join(folder, 'sync_after')
+
+        def setup():
+            for source, destination in ((before, work_before), (after, work_after)):
+                shutil.rmtree(destination, ignore_errors=True)
+                shutil.copytree(source, destination)
+        return (lambda: sync_folders(work_before, work_after)), setup
+
+    raise ValueError(f'Unknown stage: {stage}')
+
+
+def measure_stage(stage: str, folder: str, fixtures: str, repeat: int) -> dict:
+    """
+    Measures a stage. Meant to run in a new process, so that the peak RSS is the one of this stage only.
+
+    Parameters:
+        - stage (str): Name of the stage.
+        - folder (str): Folder of the synthetic snapshot.
+        - fixtures (str): Folder of saved HTML record pages for the parse stage, or None.
+        - repeat (int): Number of timed runs; the best one is kept.
+
+    Returns:
+        - dict: The wall time (s), peak RSS (MB) and peak of traced allocations (MB) of the stage.
+    """
+    run, setup = prepare_stage(stage, folder, fixtures)
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    rss = peak_rss_mb()
+
+    # Allocations are traced in a separate run, tracemalloc slowing the measured code down
+    setup()
+    tracemalloc.start()
+    run()
+    alloc_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'wall_s': min(timings), 'peak_rss_mb': rss, 'alloc_peak_mb': alloc_peak / 2**20}
+
+
+def run_benchmark(rows: list, change_rates: list, stages: list, repeat: int, fixtures: str) -> dict:
+    """
+    Runs every stage on every synthetic snapshot, each stage in a new process.
+
+    Returns:
+        - dict: A mapping from scenario ('<rows>rows_<change rate>') to a mapping from stage to metrics.
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for n in rows:
+        for rate in change_rates:
+            scenario = f'{n}rows_{rate:g}'
+            results[scenario] = {}
+            with tempfile.TemporaryDirectory() as folder:
+                synthetic_snapshot(folder, n, rate)
+                for stage in stages:
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        metrics = pool.submit(measure_stage, stage, folder, fixtures, repeat).result()
+                    results[scenario][stage] = metrics
+                    print(f"{scenario:22s} {stage:7s} {metrics['wall_s'] * 1000:10.1f} ms {metrics['peak_rss_mb']:9.1f} MB RSS "
+                          f"{metrics['alloc_peak_mb']:9.1f} MB allocated", flush=True)
+    return results
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compares results to a baseline.
+
+    Parameters:
+        - results (dict): Results of run_benchmark.
+        - baseline (dict): Stored results of a previous run_benchmark.
+        - threshold (float): Allowed relative increase of a metric (e.g. 0.25 for +25%).
+
+    Returns:
+        - list: A description of each metric that regressed beyond the threshold.
+    """
+    found = []
+    for scenario, stages in results.items():
+        for stage, metrics in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            for metric in METRICS:
+                limit = max(reference[metric] * (1 + threshold), reference[metric] + MIN_REGRESSION[metric])
+                if metrics[metric] > limit:
+                    found.append(f'{scenario} {stage} {metric}: {metrics[metric]:.4g} > {limit:.4g} '
+                                 f'(baseline {reference[metric]:.4g})')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrape -> diff -> tweet pipeline on synthetic snapshots.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[900, 10_000], help="Total records per snapshot (up to e.g. 1000000).")
+    parser.add_argument("--change-rates", type=float, nargs="+", default=[0.01, 0.1], help="Fractions of changed records.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to measure.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs per stage; the best one is kept.")
+    parser.add_argument("--fixtures", help="Folder of saved HTML record pages used by the parse stage.")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed relative regression against the baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline file.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="Fail if a stage regressed against the baseline.")
+    mode.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.change_rates, args.stages, args.repeat, args.fixtures)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        for scenario, stages in results.items():
+            baseline.setdefault(scenario, {}).update(stages)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    elif args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.threshold)
+        if found:
+            sys.exit('\nRegressions against the baseline:\n' + '\n'.join(found))
+        print(f"\nNo regression beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of the start-up time of the bot on a day with nothing to post.
+
+Measures the best wall time of new Python processes for:
+- the third-party imports that bot.py and web_scraping.py used to do at module load time (baseline),
+- 'cli.py --help',
+- 'cli.py post' and 'cli.py diff' in a copy of the data where data/data_before and data/data_after are identical, i.e. a no-op day.
+  The copy is made again before each run, outside of the timed section, since 'cli.py post' syncs the folders.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--repeat N]
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+############################################################################################################
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, 'cli.py')
+EAGER_IMPORTS = "import numpy, pandas, tweepy, pycountry, bs4, selenium.webdriver"
+
+############################################################################################################
+
+def best_time(command: list, cwd: str, repeat: int, setup=lambda: None) -> float:
+    """
+    Returns the best wall time, in seconds, of a command run in a new process, `setup` being called before each run.
+    """
+    return min(timeit.repeat(lambda: subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL), setup=setup,
+                             number=1, repeat=repeat))
+
+
+def no_op_day(folder: str) -> None:
+    """
+    Fills the snapshot folders of a working folder with the same records.
+    """
+    for name in ('data/data_after', 'data/data_before'):
+        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+        shutil.copytree(os.path.join(ROOT, 'data/data_after'), os.path.join(folder, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the start-up time of the bot on a no-op day.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs timed per command.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'log'))
+        setup = lambda: no_op_day(tmp)
+
+        timings = {
+            'eager imports (baseline)': best_time([sys.executable, '-c', EAGER_IMPORTS], ROOT, args.repeat),
+            'cli.py --help': best_time([sys.executable, CLI, '--help'], tmp, args.repeat),
+            'cli.py diff (no-op)': best_time([sys.executable, CLI, 'diff'], tmp, args.repeat, setup),
+            'cli.py post (no-op)': best_time([sys.executable, CLI, 'post'], tmp, args.repeat, setup),
+        }
+
+    baseline = timings['eager imports (baseline)']
+    for name, elapsed in timings.items():
+        print(f"{name:28s} {elapsed * 1000:8.1f} ms   ({elapsed / baseline:.0%} of baseline)")
+
+if __name__ == "__main__":
+    main()
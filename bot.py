@@ -2,12 +2,19 @@
 This script automates the process of posting updates to Twitter based on the analysis of athletics records data.
 
 Workflow:
+0. Compare the content hashes of the 'before' and 'after' data folders. If no records file changed, only synchronize the data
+   folders (step 6) and stop.
 1. Authenticate with the Twitter API using credentials.
 2. Load and analyze athletics records data to identify noteworthy changes or updates.
-3. Generate tweet messages based on the analysis.
-4. Post the generated messages to Twitter.
-5. Synchronize data folders by moving processed data for archival and preparing for the next analysis cycle.
-6. Log all operations and their outcomes for monitoring and debugging purposes.
+3. Group the changes of a same performance across categories (e.g. a world record that is also an area record, see
+   record_groups) and generate one tweet message per group.
+4. Post the generated messages to Twitter through a rate-limit-aware queue (see tweet_queue), skipping records already
+   announced and saving each posted tweet to log/tweets.db (see tweet_store). If a message could not be posted, exit with an
+   error before steps 5 and 6, so that the next run finds the same changes and retries it.
+5. Append the record changes to the record history (see record_history).
+6. Synchronize data folders by moving processed data for archival and preparing for the next analysis cycle.
+7. Log all operations and their outcomes for monitoring and debugging purposes, and the timings of the diff, render, post and
+   sync stages to log/metrics.jsonl (see instrumentation).
 
 Author: LE GOURRIEREC Titouan
 """
@@ -15,21 +22,34 @@ Author: LE GOURRIEREC Titouan
 ############################################################################################################
 
 import logging
-import time
-import numpy as np
+import sys
 
-from data_analysis import generate_diff_dataframes
-from data_utils import twitter_message
-from file_operations import sync_folders
-from twitter_utils import authenticate_twitter, post_tweet
+from file_operations import changed_files, sync_folders
+from instrumentation import setup_metrics
+from log_setup import setup_logging
 
-logging.basicConfig(filename='log/log.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
+# pandas, pyarrow and tweepy are only imported by main() once it is known that a record file changed, so that a run with
+# nothing to post starts and exits quickly
 
 ############################################################################################################
 ################################              Main function              ###################################
 ############################################################################################################
 
 def main():
+    # Stop before doing anything expensive if no records file changed, leaving the folders as a full run would
+    if not changed_files():
+        sync_folders()
+        logging.info("No records file changed. Folders synced. Script completed. \n\n --- \n")
+        return
+
+    from data_analysis import generate_diff_dataframes
+    from data_utils import record_keys, twitter_message
+    from record_groups import group_record_changes
+    from record_history import append_changes
+    from tweet_queue import TweetDispatcher
+    from tweet_store import TweetStore
+    from twitter_utils import authenticate_twitter
+
     # Authenticate with Twitter
     client, api = authenticate_twitter()
     logging.info("Authenticated with Twitter.")
@@ -38,21 +58,31 @@ def main():
     df = generate_diff_dataframes()
     logging.info("Data loaded.")
 
-    # Generate the tweet message
-    messages = twitter_message(df)
-    logging.info(f"{len(messages)} Tweet messages generated.")
+    # Generate one tweet message per performance, whatever the number of categories it is a record of
+    events = group_record_changes(df)
+    messages = twitter_message(events)
+    logging.info(f"{len(messages)} Tweet messages generated for {len(df)} record changes.")
+
+    # Post the tweets, paced by the API rate limit and skipping records and messages already posted
+    store = TweetStore()
+    with TweetDispatcher(client, api, store) as dispatcher:
+        for message, record_key in zip(messages, record_keys(events)):
+            dispatcher.submit(message, record_key)
+    store.close()
+    logging.info(f"{len(dispatcher.posted)} tweets posted and saved to log/tweets.db.")
+    if dispatcher.failed:
+        # The folders are left unsynced, so that the next run diffs the same changes and retries the failed messages
+        logging.info(f"{len(dispatcher.failed)} messages could not be posted. Folders not synced.")
+        sys.exit(f"{len(dispatcher.failed)} messages could not be posted.")
 
-    # Post the tweets
-    memory = np.load("log/memory.npy").tolist()
-    for message in messages:
-        response = post_tweet(client, api, message)
-        memory.append(response.data['id'])
-        time.sleep(5)
-    np.save("log/memory.npy", memory)
+    append_changes(df)
+    logging.info("Record changes appended to data/history.")
 
     sync_folders()
     logging.info("Folders synced. data/data_after files moved to data/data_before and cleared.")
     logging.info("Script completed. \n\n --- \n")
 
 if __name__ == "__main__":
+    setup_logging()
+    setup_metrics()
     main()
\ No newline at end of file
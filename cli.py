@@ -0,0 +1,113 @@
+"""
+Command line entry point of the World Athletics Records project.
+
+Subcommands:
+- scrape: Scrapes the record pages into data/data_after (see web_scraping).
+- diff: Prints the record changes between data/data_before and data/data_after, rendered as tweets, threads or a JSON Feed,
+  one per performance (see record_groups) and without posting anything.
+- post: Posts the record changes to Twitter, records them in the history and syncs the data folders (see bot).
+- sync: Moves data/data_after to data/data_before (see file_operations.sync_folders).
+
+Only the standard library is imported at start-up; each subcommand imports the modules (and thus pandas, pyarrow, Selenium,
+tweepy, ...) it needs, and the diff and post subcommands exit before loading any of them when no record file changed.
+
+Every subcommand appends the timings of its stages to log/metrics.jsonl (see instrumentation); --prometheus also writes their
+totals to a Prometheus text-format file at the end of the run.
+
+Usage:
+    python cli.py [--prometheus FILE] scrape [--workers N] [--backend http|selenium] [--base-url URL] [--max-age SECONDS]
+    python cli.py [--prometheus FILE] diff [--format text|thread|json]
+    python cli.py [--prometheus FILE] post
+    python cli.py [--prometheus FILE] sync
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+import logging
+
+from file_operations import changed_files
+from instrumentation import setup_metrics, span, write_prometheus
+from log_setup import setup_logging
+from web_scraping import BASE_URL, DEFAULT_MAX_AGE
+
+############################################################################################################
+##############################                Subcommands                 ##################################
+############################################################################################################
+
+def scrape(args: argparse.Namespace) -> None:
+    from web_scraping import main as scrape_main
+
+    scrape_main(args.workers, args.backend, args.base_url, args.max_age)
+
+
+def diff(args: argparse.Namespace) -> None:
+    if not changed_files():
+        print("No records file changed.")
+        return
+
+    from data_analysis import generate_diff_dataframes
+    from data_utils import record_keys, render_fields, render_json_feed, render_text, render_threads
+    from record_groups import group_record_changes
+
+    df = group_record_changes(generate_diff_dataframes())
+    with span('render', rows=len(df), format=args.format):
+        fields = render_fields(df)
+        if args.format == "json":
+            output = [render_json_feed(fields, record_keys(df))]
+        elif args.format == "thread":
+            output = ["\n\n".join(thread) + "\n\n---\n" for thread in render_threads(fields)]
+        else:
+            output = [message + "\n\n---\n" for message in render_text(fields)]
+    print("\n".join(output))
+
+
+def post(args: argparse.Namespace) -> None:
+    import bot
+
+    bot.main()
+
+
+def sync(args: argparse.Namespace) -> None:
+    from file_operations import sync_folders
+
+    sync_folders()
+    logging.info("Folders synced. data/data_after files moved to data/data_before and cleared.")
+
+
+############################################################################################################
+##############################                Command line                ##################################
+############################################################################################################
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="World Athletics Records bot.")
+    parser.add_argument("--prometheus", metavar="FILE", help="Also write the stage totals of the run to a Prometheus text file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scrape_parser = subparsers.add_parser("scrape", help="Scrape the record pages into data/data_after.")
+    scrape_parser.add_argument("--workers", type=int, default=None, help="Number of concurrent workers (default: number of cores).")
+    scrape_parser.add_argument("--backend", choices=["http", "selenium"], default="http", help="How pages are fetched.")
+    scrape_parser.add_argument("--base-url", default=BASE_URL, help="URL prefix of the records pages.")
+    scrape_parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE,
+                               help="Seconds under which a completed or cached page is not fetched again (default: 12 h, 0 to refetch all).")
+    scrape_parser.set_defaults(func=scrape)
+
+    diff_parser = subparsers.add_parser("diff", help="Print the record changes without posting them.")
+    diff_parser.add_argument("--format", choices=["text", "thread", "json"], default="text", help="Output format.")
+    diff_parser.set_defaults(func=diff)
+
+    subparsers.add_parser("post", help="Post the record changes and sync the data folders.").set_defaults(func=post)
+    subparsers.add_parser("sync", help="Move data/data_after to data/data_before.").set_defaults(func=sync)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    setup_metrics(prometheus_path=args.prometheus)
+    try:
+        args.func(args)
+    finally:
+        write_prometheus()
+
+if __name__ == "__main__":
+    main()
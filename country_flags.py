@@ -0,0 +1,72 @@
+"""
+This module maps the country codes used by World Athletics to flag emojis.
+
+World Athletics identifies countries by their IOC codes (GER, NED, SUI, RSA, ...), which often differ from the ISO 3166-1 alpha-3
+codes. The table below maps every IOC code (plus the few extra codes used by World Athletics) to the ISO 3166-1 alpha-2 code whose
+Regional Indicator Symbols form the flag emoji. Former countries whose flag is identical to a current one (FRG, TCH) map to it,
+and the others (URS, GDR, YUG, ...) map to no flag.
+
+The table is only turned into a read-only mapping on the first lookup, and lookups are fronted by a bounded cache.
+
+Functions:
+- ioc_to_flag(code): Returns the flag emoji of an IOC country code, or an empty string.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+from functools import lru_cache
+from types import MappingProxyType
+
+############################################################################################################
+
+IOC_TO_ISO2 = """
+AFG AF  AIA AI  ALB AL  ALG DZ  AND AD  ANG AO  ANT AG  ARG AR  ARM AM  ARU AW  ASA AS  AUS AU  AUT AT  AZE AZ  BAH BS
+BAN BD  BAR BB  BDI BI  BEL BE  BEN BJ  BER BM  BHU BT  BIH BA  BIZ BZ  BLR BY  BOL BO  BOT BW  BRA BR  BRN BH  BRU BN
+BUL BG  BUR BF  CAF CF  CAM KH  CAN CA  CAY KY  CGO CG  CHA TD  CHI CL  CHN CN  CIV CI  CMR CM  COD CD  COK CK  COL CO
+COM KM  CPV CV  CRC CR  CRO HR  CUB CU  CYP CY  CZE CZ  DEN DK  DJI DJ  DMA DM  DOM DO  ECU EC  EGY EG  ERI ER  ESA SV
+ESP ES  EST EE  ETH ET  FIJ FJ  FIN FI  FRA FR  FSM FM  GAB GA  GAM GM  GBR GB  GBS GW  GEO GE  GEQ GQ  GER DE  GHA GH
+GIB GI  GRE GR  GRN GD  GUA GT  GUI GN  GUM GU  GUY GY  HAI HT  HKG HK  HON HN  HUN HU  INA ID  IND IN  IRI IR  IRL IE
+IRQ IQ  ISL IS  ISR IL  ISV VI  ITA IT  IVB VG  JAM JM  JOR JO  JPN JP  KAZ KZ  KEN KE  KGZ KG  KIR KI  KOR KR  KOS XK
+KSA SA  KUW KW  LAO LA  LAT LV  LBA LY  LBN LB  LBR LR  LCA LC  LES LS  LIE LI  LTU LT  LUX LU  MAC MO  MAD MG  MAR MA
+MAS MY  MAW MW  MDA MD  MDV MV  MEX MX  MGL MN  MHL MH  MKD MK  MLI ML  MLT MT  MNE ME  MON MC  MOZ MZ  MRI MU  MSR MS
+MTN MR  MYA MM  NAM NA  NCA NI  NED NL  NEP NP  NGR NG  NIG NE  NOR NO  NRU NR  NZL NZ  OMA OM  PAK PK  PAN PA  PAR PY
+PER PE  PHI PH  PLE PS  PLW PW  PNG PG  POL PL  POR PT  PRK KP  PUR PR  QAT QA  ROU RO  RSA ZA  RUS RU  RWA RW  SAM WS
+SEN SN  SEY SC  SGP SG  SKN KN  SLE SL  SLO SI  SMR SM  SOL SB  SOM SO  SRB RS  SRI LK  SSD SS  STP ST  SUD SD  SUI CH
+SUR SR  SVK SK  SWE SE  SWZ SZ  SYR SY  TAN TZ  TGA TO  THA TH  TJK TJ  TKM TM  TKS TC  TLS TL  TOG TG  TPE TW  TTO TT
+TUN TN  TUR TR  TUV TV  UAE AE  UGA UG  UKR UA  URU UY  USA US  UZB UZ  VAN VU  VEN VE  VIE VN  VIN VC  YEM YE  ZAM ZM
+ZIM ZW  FRG DE  TCH CZ
+"""
+NO_FLAG = ('URS', 'GDR', 'YUG', 'SCG', 'EUN', 'ANA', 'AIN')
+
+############################################################################################################
+
+@lru_cache(maxsize=1)
+def flag_table() -> MappingProxyType:
+    """
+    Builds the read-only mapping from IOC code to flag emoji, on first use.
+
+    Returns:
+        - MappingProxyType: The mapping.
+    """
+    tokens = IOC_TO_ISO2.split()
+    table = {ioc: ''.join(chr(0x1F1E6 + ord(letter) - ord('A')) for letter in iso2) for ioc, iso2 in zip(tokens[::2], tokens[1::2])}
+    table.update({ioc: '' for ioc in NO_FLAG})
+    return MappingProxyType(table)
+
+
+@lru_cache(maxsize=512)
+def ioc_to_flag(code: str) -> str:
+    """
+    Returns the flag emoji of a country given by its IOC code, or an empty string for unknown codes and former countries.
+
+    Parameters:
+        - code (str): The IOC country code (e.g. 'GER'), case-insensitive.
+
+    Returns:
+        - str: The flag emoji.
+    """
+    if not isinstance(code, str):
+        return ''
+    return flag_table().get(code.strip().upper(), '')
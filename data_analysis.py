@@ -1,51 +1,142 @@
 """
 This Python script defines a function to generate a DataFrame that highlights differences between 'before' and 'after' records
 across various categories and sexes in sports data. It compares records from two sets of CSV files, identifies changes, and aggregates
-these differences into a comprehensive DataFrame with additional 'SEX' and 'CATEGORY' columns for clarity.
+these differences into a comprehensive DataFrame with additional 'SEX', 'CATEGORY', 'CHANGE_TYPE' and 'OCCURRENCE' columns for clarity.
+
+Category/sex pairs whose files have the same content hash in both folders (see file_operations.changed_files) are skipped. When a
+snapshot folder has a columnar record store (see record_store), the records are read from it in one memory-mapped file read
+instead of one CSV file per pair. Each before/after pair is compared with vectorized hash joins: within each discipline, identical
+records are paired first, and the remaining ones are matched by their order, so that disciplines listed several times in the same
+table (tied records such as "Pole Vault" or "Mile Road") are matched one to one, even when the first of them leaves the table.
 
 Author: LE GOURRIEREC Titouan
 """
 
 ############################################################################################################
 
+import os
+
 import pandas as pd
 
+from file_operations import changed_files
+from instrumentation import span
+from performance import add_improvement, perf_values
+from record_store import RECORD_CATEGORIES, SEX_CATEGORIES, STORE_NAME, read_store
+
 ############################################################################################################
 
-def generate_diff_dataframes() -> pd.DataFrame:
+RECORD_COLUMNS = ['DISCIPLINE', 'PERF', 'COMPETITOR', 'DOB', 'COUNTRY', 'VENUE', 'DATE']
+
+VALUE_COLUMNS = RECORD_COLUMNS[1:]
+DIFF_COLUMNS = (['DISCIPLINE'] + [f'{col}_before' for col in VALUE_COLUMNS] + [f'{col}_after' for col in VALUE_COLUMNS]
+                + ['SEX', 'CATEGORY', 'CHANGE_TYPE', 'OCCURRENCE', 'PERF_VALUE_before', 'PERF_VALUE_after', 'LOWER_IS_BETTER',
+                   'IMPROVEMENT'])
+
+############################################################################################################
+
+def _keyed(data: pd.DataFrame, by: list = ()) -> pd.DataFrame:
+    """
+    Adds the join key (occurrence index of each discipline) and a content hash of the record columns to a records DataFrame.
+
+    Parameters:
+        - data (pd.DataFrame): A records DataFrame with the RECORD_COLUMNS columns.
+        - by (list): Additional columns identifying independent tables within the DataFrame.
+
+    Returns:
+        - pd.DataFrame: A copy of the records with additional '_OCC', '_HASH' and 'PERF_VALUE' columns.
+    """
+    keyed = data[[*by, *RECORD_COLUMNS]].copy()
+    # Numeric performances are precomputed in the record store, and parsed here for records read from CSV files
+    keyed['PERF_VALUE'] = data['PERF_VALUE'] if 'PERF_VALUE' in data else perf_values(data['PERF'])
+    # Plain strings rather than categoricals, so that the join keeps the table order whatever the source of the records
+    keyed['DISCIPLINE'] = keyed['DISCIPLINE'].astype(str)
+    keyed['_OCC'] = keyed.groupby([*by, 'DISCIPLINE'], sort=False).cumcount()
+    keyed['_HASH'] = pd.util.hash_pandas_object(keyed[VALUE_COLUMNS], index=False).to_numpy()
+    return keyed
+
+
+def diff_records(data_before: pd.DataFrame, data_after: pd.DataFrame, by: list = ()) -> pd.DataFrame:
+    """
+    Compares two records DataFrames of the same sex and category and returns the added, removed and changed records.
+
+    Several pairs of tables can be compared in one call by concatenating them with columns identifying each pair, given in `by`.
+
+    Parameters:
+        - data_before (pd.DataFrame): The previous records.
+        - data_after (pd.DataFrame): The new records.
+        - by (list): Additional columns identifying independent pairs of tables, which are kept in the result.
+
+    Returns:
+        - pd.DataFrame: One row per changed record with '_before' and '_after' columns (including 'PERF_VALUE'), a 'CHANGE_TYPE' column
+          ('added', 'removed' or 'changed') and an 'OCCURRENCE' column (index of the record among those of its discipline, in the
+          new records, or in the previous ones for a removed record).
+    """
+    before, after = _keyed(data_before, by), _keyed(data_after, by)
+    # Identical records are paired first (the n-th copy of a record with the n-th copy), so that a tied record leaving the table
+    # does not shift the ones listed after it
+    keys = [*by, 'DISCIPLINE', '_HASH', '_COPY']
+    for keyed in (before, after):
+        keyed['_COPY'] = keyed.groupby(keys[:-1], sort=False).cumcount()
+    before_keys, after_keys = pd.MultiIndex.from_frame(before[keys]), pd.MultiIndex.from_frame(after[keys])
+    before, after = before[~before_keys.isin(after_keys)].copy(), after[~after_keys.isin(before_keys)].copy()
+
+    # The remaining records of each discipline are matched by their order
+    for keyed in (before, after):
+        keyed['_LEFT'] = keyed.groupby([*by, 'DISCIPLINE'], sort=False).cumcount()
+    merged = pd.merge(before, after, on=[*by, 'DISCIPLINE', '_LEFT'], how='outer', suffixes=('_before', '_after'),
+                      indicator=True, sort=False)
+
+    merged['CHANGE_TYPE'] = merged['_merge'].map({'left_only': 'removed', 'right_only': 'added', 'both': 'changed'}).astype(str)
+    merged['OCCURRENCE'] = merged['_OCC_after'].fillna(merged['_OCC_before']).astype(int)
+    return merged.drop(columns=['_OCC_before', '_OCC_after', '_HASH_before', '_HASH_after', '_COPY_before', '_COPY_after',
+                                '_LEFT', '_merge'])
+
+
+def load_records(folder: str, partitions: list) -> dict:
+    """
+    Loads the records of the given partitions of a snapshot folder, from its record store if it has one, else from the CSV files.
+
+    Parameters:
+        - folder (str): The snapshot folder.
+        - partitions (list): Names of the partitions to load (e.g. ['men_world']).
+
+    Returns:
+        - dict: A mapping from partition name to records DataFrame.
+    """
+    records = read_store(folder, partitions) if os.path.exists(os.path.join(folder, STORE_NAME)) else {}
+    for name in partitions:
+        if name not in records:
+            records[name] = pd.read_csv(f'{folder}/{name}_records.csv')
+    return records
+
+
+def generate_diff_dataframes(before_path: str = 'data/data_before', after_path: str = 'data/data_after') -> pd.DataFrame:
     """
     Generates a DataFrame containing differences between 'before' and 'after' records for each sex and category combination.
 
+    Parameters:
+        - before_path (str): Folder containing the previous records (record store or CSV files).
+        - after_path (str): Folder containing the new records (record store or CSV files).
+
     Returns:
-    - A DataFrame containing all differences with additional 'SEX' and 'CATEGORY' columns.
-    """
-
-    sex_categories = ['men', 'women']
-    record_categories = ['world', 'olympic_games', 'african', 'asian', 'european', 'nacac', 'oceanian', 'south_american']
-
-    data_diff_global = pd.DataFrame()
-
-    for s in sex_categories:
-        for c in record_categories:
-            file_name_before = f'data/data_before/{s}_{c}_records.csv'
-            file_name_after = f'data/data_after/{s}_{c}_records.csv'
-            
-            data_before = pd.read_csv(file_name_before)
-            data_after = pd.read_csv(file_name_after)
-            
-            data_diff = pd.DataFrame()
-            
-            for discipline in data_before["DISCIPLINE"].unique():
-                row_data_before = data_before[data_before["DISCIPLINE"] == discipline]
-                row_data_after = data_after[data_after["DISCIPLINE"] == discipline]
-                
-                if not row_data_before.equals(row_data_after):
-                    merged_row = pd.merge(row_data_before, row_data_after, on="DISCIPLINE", how="outer", suffixes=('_before', '_after'))
-                    merged_row['SEX'] = s
-                    merged_row['CATEGORY'] = c
-                    data_diff = pd.concat([data_diff, merged_row], ignore_index=True)
-            
-            data_diff_global = pd.concat([data_diff_global, data_diff], ignore_index=True)
-    
-    return data_diff_global
+    - A DataFrame containing all differences with additional 'SEX', 'CATEGORY', 'CHANGE_TYPE' and 'OCCURRENCE' columns, and the
+      numeric performances and margin of the change (see performance.add_improvement).
+    """
+    with span('diff') as stage:
+        changed = changed_files(before_path, after_path)
+        pairs = [(s, c) for s in SEX_CATEGORIES for c in RECORD_CATEGORIES if f'{s}_{c}_records.csv' in changed]
+        partitions = [f'{s}_{c}' for s, c in pairs]
+        records_before = load_records(before_path, partitions)
+        records_after = load_records(after_path, partitions)
+        diffs = []
+
+        for s, c in pairs:
+            data_diff = diff_records(records_before[f'{s}_{c}'], records_after[f'{s}_{c}'])
+            data_diff['SEX'] = s
+            data_diff['CATEGORY'] = c
+            diffs.append(data_diff)
 
+        stage.set(files=len(pairs), rows=sum(len(data_diff) for data_diff in diffs))
+        if not diffs:
+            return pd.DataFrame(columns=DIFF_COLUMNS)
+        return add_improvement(pd.concat(diffs, ignore_index=True))[DIFF_COLUMNS]
@@ -4,20 +4,70 @@ It includes functions for converting country codes to flag emojis and generating
 that contain differences in sports records.
 
 Functions:
-- country_code_to_flag_emoji(country_code): Converts an ISO 3166-1 alpha-2 country code into the corresponding flag emoji.
+- country_code_to_flag_emoji(country_code): Converts a World Athletics (IOC) country code into the corresponding flag emoji.
+- render_fields(dataframe): Precomputes the message fields of a DataFrame containing differences in sports records.
+- render_text(fields), render_threads(fields), render_json_feed(fields, keys): Render the messages as tweets, threads or a JSON Feed.
 - twitter_message(dataframe): Generates messages for Twitter from a DataFrame containing differences in sports records.
+- record_keys(dataframe): Returns a key identifying the new record of each row of a DataFrame of differences.
 
 Author: LE GOURRIEREC Titouan
 """
 
 ############################################################################################################
 
-import logging
+import json
 
+import numpy as np
 import pandas as pd
-import pycountry
 
-logging.basicConfig(filename='log/log.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
+from country_flags import ioc_to_flag
+from instrumentation import span
+
+############################################################################################################
+
+TWEET_MAX_LENGTH = 280
+
+HEADLINE_TEMPLATE = "🚨 New {discipline} {sex} {category} Record Alert! 🚨"
+NEW_RECORD_TEMPLATES = [
+    "🌟 {new_competitor} ({new_flag}) shatters the record with a performance of {new_perf} 🏆 in {new_venue}, {new_date}.",
+    "🌟 {new_competitor} ({new_flag}) shatters the record with a performance of {new_perf} 🏆 on {new_date}.",
+]
+OLD_RECORD_TEMPLATES = [
+    "👏 Previous record: {old_competitor} ({old_flag}) - {old_perf} in {old_venue}, {old_date}.",
+    "👏 Previous record: {old_competitor} ({old_flag}) - {old_perf}, {old_date}.",
+]
+# A changed record that is not better than the previous one (e.g. a corrected venue or date, or a downward correction)
+CORRECTION_HEADLINE_TEMPLATE = "📝 {discipline} {sex} {category} Record Updated"
+CORRECTION_TEMPLATES = [
+    "✏️ Now listed: {new_competitor} ({new_flag}) - {new_perf} in {new_venue}, {new_date}.",
+    "✏️ Now listed: {new_competitor} ({new_flag}) - {new_perf}, {new_date}.",
+]
+PREVIOUS_LISTING_TEMPLATES = [
+    "Previously listed: {old_competitor} ({old_flag}) - {old_perf} in {old_venue}, {old_date}.",
+    "Previously listed: {old_competitor} ({old_flag}) - {old_perf}, {old_date}.",
+]
+# A record no longer listed, whose only values are the ones of the previous record
+REMOVAL_HEADLINE_TEMPLATE = "❌ {discipline} {sex} {category} Record Removed"
+REMOVAL_TEMPLATES = [
+    "No longer listed: {old_competitor} ({old_flag}) - {old_perf} in {old_venue}, {old_date}.",
+    "No longer listed: {old_competitor} ({old_flag}) - {old_perf}, {old_date}.",
+]
+# (headline, main line templates, previous record templates or None) of each kind of change
+KIND_TEMPLATES = {
+    'record': (HEADLINE_TEMPLATE, NEW_RECORD_TEMPLATES, OLD_RECORD_TEMPLATES),
+    'correction': (CORRECTION_HEADLINE_TEMPLATE, CORRECTION_TEMPLATES, PREVIOUS_LISTING_TEMPLATES),
+    'removal': (REMOVAL_HEADLINE_TEMPLATE, REMOVAL_TEMPLATES, None),
+}
+# (main line template, previous record template or None), from the longest message to the shortest
+SHORTENING_STEPS = [(0, 0), (0, 1), (1, 1), (1, None)]
+
+# For each kind of change, (template with the previous record, template without it) for each shortening step
+COMPILED_TEMPLATES = {
+    kind: [('\n'.join([headline, main[new]] + ([old[old_step]] if old is not None and old_step is not None else [])),
+            '\n'.join([headline, main[new]]))
+           for new, old_step in SHORTENING_STEPS]
+    for kind, (headline, main, old) in KIND_TEMPLATES.items()
+}
 
 ############################################################################################################
 
@@ -26,32 +76,159 @@ def country_code_to_flag_emoji(country_code_alpha3: str) -> str:
     Converts country codes to their corresponding flag emoji.
 
     Parameters:
-        - country_code_alpha3 (str): The alpha-3 country code.
+        - country_code_alpha3 (str): The IOC country code used by World Athletics (e.g. 'GER', 'SUI').
     
     Returns:
-        - str: The flag emoji corresponding to the country code.
+        - str: The flag emoji corresponding to the country code, or an empty string if there is none.
     
     Note:
-        This function uses the pycountry library to get the country name from the alpha-3 code and then converts the alpha-2 code to
-        the flag emoji using the Unicode Regional Indicator Symbols.
+        This function looks the code up in the precomputed IOC table of country_flags, which is cached and does not need
+        pycountry (whose ISO alpha-3 codes differ from the IOC ones for many countries).
+    """
+    return ioc_to_flag(country_code_alpha3)
+
+
+def render_fields(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Precomputes, column by column, the text fields of the messages of a DataFrame of differences.
+
+    Missing values become empty strings and country codes are converted to flags once per distinct code, so that every output
+    format (see render_text, render_json_feed and render_threads) is rendered from the same columns. For changes grouped by
+    record_groups, the category is the label of every category whose record changed with it (e.g. 'WR + AR + OR').
+
+    The 'kind' column selects the templates of each row (see KIND_TEMPLATES): 'removal' for a removed record, 'correction' for a
+    changed record whose performance is not better than the previous one (IMPROVEMENT of zero or less), and 'record' otherwise.
+
+    Parameters:
+        - df (pd.DataFrame): A DataFrame of differences, as returned by data_analysis.generate_diff_dataframes.
+
+    Returns:
+        pd.DataFrame: One row per difference, with one column per template field.
+    """
+    category = df['CATEGORY'].astype(str).str.replace('_', '')
+    if 'CATEGORIES' in df:
+        category = category.where(df['CATEGORIES'].fillna('') == '', df['CATEGORIES'])
+    fields = pd.DataFrame({'discipline': df['DISCIPLINE'], 'sex': df['SEX'], 'category': category})
+    for when, prefix in (('after', 'new'), ('before', 'old')):
+        for column in ('COMPETITOR', 'PERF', 'VENUE', 'DATE'):
+            fields[f'{prefix}_{column.lower()}'] = df[f'{column}_{when}']
+        countries = df[f'COUNTRY_{when}'].astype(object)
+        flags = {code: country_code_to_flag_emoji(code) for code in countries.dropna().unique()}
+        fields[f'{prefix}_flag'] = countries.map(flags)
+    fields = fields.astype(object).where(fields.notna(), '').astype(str)
+    fields['has_old'] = (fields['old_perf'] != '').to_numpy()
+    change = df['CHANGE_TYPE'].to_numpy()
+    fields['kind'] = np.select([change == 'removed', (change == 'changed') & (df['IMPROVEMENT'].to_numpy(dtype=float) <= 0)],
+                               ['removal', 'correction'], 'record')
+    return fields.reset_index(drop=True)
+
+
+def tweet_length(message: str) -> int:
+    """
+    Returns the length of a message as counted by Twitter: characters of the Latin, Greek, Cyrillic and similar scripts and of
+    the common punctuation ranges count 1, every other character (emojis, CJK, ...) counts 2.
+
+    Parameters:
+        - message (str): The message.
+
+    Returns:
+        int: The weighted length.
+    """
+    return sum(1 if ord(char) <= 0x10FF or 0x2000 <= ord(char) <= 0x200D or 0x2010 <= ord(char) <= 0x201F
+               or 0x2032 <= ord(char) <= 0x2037 else 2 for char in message)
+
+
+def _fit(message: str) -> str:
+    """
+    Truncates a message to the tweet length limit, ending it with an ellipsis.
+    """
+    # The ellipsis is outside the ranges counted once, so it takes two characters of the limit
+    while tweet_length(message) > TWEET_MAX_LENGTH - tweet_length('…'):
+        message = message[:-1]
+    return message.rstrip() + '…'
+
+
+def render_text(fields: pd.DataFrame) -> list:
+    """
+    Renders the plain-text tweets of precomputed message fields (see render_fields), each within the tweet length limit.
+
+    Each row is rendered with the templates of its kind of change, and the first step of SHORTENING_STEPS that fits: full message,
+    then without the venue of the previous record, then without any venue, then without the previous record. If even the last one
+    is too long, it is truncated.
+
+    Parameters:
+        - fields (pd.DataFrame): The message fields.
+
+    Returns:
+        list: One message per row.
+    """
+    rows = fields.to_dict('records')
+    messages = [None] * len(rows)
+    pending = list(range(len(rows)))
+    for step in range(len(SHORTENING_STEPS)):
+        last = step == len(SHORTENING_STEPS) - 1
+        remaining = []
+        for i in pending:
+            with_old, without_old = COMPILED_TEMPLATES[rows[i]['kind']][step]
+            message = (with_old if rows[i]['has_old'] else without_old).format_map(rows[i])
+            if tweet_length(message) <= TWEET_MAX_LENGTH:
+                messages[i] = message
+            elif last:
+                messages[i] = _fit(message)
+            else:
+                remaining.append(i)
+        pending = remaining
+    return messages
+
+
+def render_threads(fields: pd.DataFrame) -> list:
     """
-    try:
-        # get country by alpha-3 code
-        country = pycountry.countries.get(alpha_3=country_code_alpha3.upper())
-        # convert alpha-2 code to flag emoji
-        return ''.join(chr(0x1F1E6 + ord(letter) - ord('A')) for letter in country.alpha_2)
-    except AttributeError:
-        return ''
+    Renders the full, unshortened messages of precomputed message fields (see render_fields) as threads: the lines of each
+    message are packed into as few tweets as possible.
 
+    Parameters:
+        - fields (pd.DataFrame): The message fields.
+
+    Returns:
+        list: One list of tweets per row.
+    """
+    threads = []
+    for row in fields.to_dict('records'):
+        with_old, without_old = COMPILED_TEMPLATES[row['kind']][0]
+        chunks = []
+        for line in (with_old if row['has_old'] else without_old).format_map(row).split('\n'):
+            if chunks and tweet_length(chunks[-1] + '\n' + line) <= TWEET_MAX_LENGTH:
+                chunks[-1] += '\n' + line
+            else:
+                chunks.append(line if tweet_length(line) <= TWEET_MAX_LENGTH else _fit(line))
+        threads.append(chunks)
+    return threads
 
-def twitter_message(df: pd.DataFrame) -> str:
+
+def render_json_feed(fields: pd.DataFrame, keys: list) -> str:
+    """
+    Renders the messages of precomputed message fields (see render_fields) as a JSON Feed (https://jsonfeed.org/version/1.1).
+
+    Parameters:
+        - fields (pd.DataFrame): The message fields.
+        - keys (list): The record key of each row (see record_keys), used as item IDs.
+
+    Returns:
+        str: The JSON document.
+    """
+    items = [{'id': key, 'content_text': message} for key, message in zip(keys, render_text(fields))]
+    return json.dumps({'version': 'https://jsonfeed.org/version/1.1', 'title': 'World Athletics Records', 'items': items},
+                      ensure_ascii=False, indent=2)
+
+
+def twitter_message(df: pd.DataFrame) -> list:
     """
     Generates a list of messages for Twitter based on the differences in sports records between two data points.
 
-    This function iterates through a DataFrame where each row represents a comparison between an old and a new record
-    in various sports disciplines. For each row, it constructs a message highlighting the new record, the discipline,
-    the category, and the sex associated with the record, along with the performance details of the new and old records.
-    It uses emojis to make the message more engaging.
+    Each row of the DataFrame represents a comparison between an old and a new record in various sports disciplines. For each
+    row, a message highlights the new record, the discipline, the category, and the sex associated with the record, along with
+    the performance details of the new and old records. It uses emojis to make the message more engaging. Removed records and
+    changes that do not improve the record are announced as such, not as new records (see render_fields).
 
     Parameters:
         - df (pd.DataFrame): A DataFrame containing columns for discipline, sex, category, and performance metrics
@@ -59,31 +236,30 @@ def twitter_message(df: pd.DataFrame) -> str:
                            'COMPETITOR_before', 'PERF_before', 'COUNTRY_before', 'VENUE_before', 'DATE_before').
 
     Returns:
-        list: A list of strings, each string is a formatted message ready to be posted on Twitter.
+        list: A list of strings, each string is a formatted message ready to be posted on Twitter (at most 280 characters).
     """
-    messages = []
-    
-    for row in df.iterrows():
-        discipline = row[1]["DISCIPLINE"]
-        sex = row[1]["SEX"]
-        category = row[1]["CATEGORY"]
-
-        new_competitor = row[1]["COMPETITOR_after"]
-        new_perf = row[1]["PERF_after"]
-        new_country = row[1]["COUNTRY_after"]
-        new_venue = row[1]["VENUE_after"]
-        new_date = row[1]["DATE_after"]
-
-        old_competitor = row[1]["COMPETITOR_before"]
-        old_perf = row[1]["PERF_before"]
-        old_country = row[1]["COUNTRY_before"]
-        old_venue = row[1]["VENUE_before"]
-        old_date = row[1]["DATE_before"]
-
-        message = f"🚨 New {discipline} {sex} {category.replace('_', '')} Record Alert! 🚨\n"
-        message += f"🌟 {new_competitor} ({country_code_to_flag_emoji(old_country)}) shatters the record with a performance of {new_perf} 🏆 in {new_venue}, {new_date}.\n"
-        message += f"👏 Previous record: {old_competitor} ({country_code_to_flag_emoji(old_country)}) - {old_perf} in {old_venue}, {old_date}."
-
-        messages.append(message)
-
-    return messages
\ No newline at end of file
+    with span('render', rows=len(df)):
+        return render_text(render_fields(df))
+
+
+def record_keys(df: pd.DataFrame) -> list:
+    """
+    Returns a key identifying the new record of each row of a DataFrame of differences, in the same order as twitter_message.
+
+    The key is made of the sex, category, discipline, performance, competitor and date of the new record, so that the same record
+    is never announced twice, even if the message wording changes. A removed record has no new record: its key is made of the
+    values of the removed one, prefixed with 'removed', so that it differs from the key of the announcement of that record.
+
+    Parameters:
+        - df (pd.DataFrame): A DataFrame of differences, as returned by data_analysis.generate_diff_dataframes.
+
+    Returns:
+        list: One key per row.
+    """
+    if df.empty:
+        return []
+    removed = df['CHANGE_TYPE'] == 'removed'
+    values = [df[column] for column in ('SEX', 'CATEGORY', 'DISCIPLINE')]
+    values += [df[f'{column}_after'].where(~removed, df[f'{column}_before']) for column in ('PERF', 'COMPETITOR', 'DATE')]
+    keys = pd.concat(values, axis=1).astype(str).agg('|'.join, axis=1)
+    return keys.where(~removed, 'removed|' + keys).tolist()
@@ -4,46 +4,181 @@ This module is designed to handle file and directory operations for the World At
 Functions:
 - sync_folders(): Synchronizes the contents of two folders ('data/data_before' and 'data/data_after'), moving all items
   from the 'after' folder to the 'before' folder, excluding 'README.md' files. It also cleans the 'before' folder
-  before synchronization by removing all items that do not match 'README.md'.
+  before synchronization by removing all items that do not match 'README.md'. The swap is crash-safe.
+- file_hash(path): Returns the SHA-256 hex digest of a file's content.
+- write_manifest(folder): Writes the content hash of every records CSV file of a folder to its manifest.
+- load_manifest(folder): Reads the manifest of a folder, hashing the files when there is no manifest.
+- changed_files(before_path, after_path): Returns the records CSV files whose content differs between the two folders.
 
 Author: LE GOURRIEREC Titouan
 """
 
 ############################################################################################################
 
+import glob
+import hashlib
+import json
 import logging
 import os
 import shutil
 
-logging.basicConfig(filename='log/log.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
+from instrumentation import span
 
 ############################################################################################################
 
-def sync_folders() -> None:
+MANIFEST_NAME = 'manifest.json'
+
+############################################################################################################
+
+def _recover_sync(before_path: str) -> None:
     """
-    Synchronizes the contents of two folders, moving all items from the 'after' folder to the 'before' folder,
-    while excluding 'README.md' files. Items in the 'before' folder that do not match 'README.md' are removed
-    before the synchronization.
+    Completes or rolls back a sync_folders call that was interrupted, based on the staging folders it left behind.
+
+    Parameters:
+        - before_path (str): The 'before' folder.
+    """
+    staging_path = f'{before_path}.new'
+    old_path = f'{before_path}.old'
+
+    if not os.path.exists(before_path) and os.path.exists(staging_path):
+        # Interrupted between the two renames of the swap: the staging folder is complete
+        os.replace(staging_path, before_path)
+        logging.info(f'Recovered interrupted sync: {staging_path} moved to {before_path}.')
+    if not os.path.exists(before_path) and os.path.exists(old_path):
+        os.replace(old_path, before_path)
+        logging.info(f'Recovered interrupted sync: {old_path} restored to {before_path}.')
+    for leftover in (staging_path, old_path):
+        if os.path.exists(leftover):
+            shutil.rmtree(leftover)
+
+
+def _swap_folders(before_path: str, after_path: str) -> int:
     """
-    before_path = 'data/data_before'
-    after_path = 'data/data_after'
+    Swaps the contents of the 'after' folder into the 'before' folder (see sync_folders) and returns the number of items moved.
+    """
+    staging_path = f'{before_path}.new'
+    old_path = f'{before_path}.old'
+    os.makedirs(staging_path)
 
     for filename in os.listdir(before_path):
-        if filename.lower() != 'readme.md':
-            file_path = os.path.join(before_path, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                logging.info(f'Failed to delete {file_path}. Reason: {e}')
+        if filename.lower() == 'readme.md':
+            shutil.copy2(os.path.join(before_path, filename), os.path.join(staging_path, filename))
 
+    moved = []
     for filename in os.listdir(after_path):
         if filename.lower() != 'readme.md':
             source = os.path.join(after_path, filename)
-            destination = os.path.join(before_path, filename)
-            try:
-                shutil.move(source, destination)
-            except Exception as e:
-                logging.info(f'Failed to move {source} to {destination}. Reason: {e}')
\ No newline at end of file
+            destination = os.path.join(staging_path, filename)
+            # Copied rather than hard-linked, so that a later in-place write to one folder cannot change the other
+            if os.path.isdir(source):
+                shutil.copytree(source, destination)
+            else:
+                shutil.copy2(source, destination)
+            moved.append(source)
+
+    os.replace(before_path, old_path)
+    os.replace(staging_path, before_path)
+    shutil.rmtree(old_path)
+
+    for source in moved:
+        try:
+            if os.path.isdir(source):
+                shutil.rmtree(source)
+            else:
+                os.unlink(source)
+        except Exception as e:
+            logging.info(f'Failed to delete {source}. Reason: {e}')
+    return len(moved)
+
+
+def sync_folders(before_path: str = 'data/data_before', after_path: str = 'data/data_after') -> None:
+    """
+    Synchronizes the contents of two folders, moving all items from the 'after' folder to the 'before' folder,
+    while excluding 'README.md' files. Items in the 'before' folder that do not match 'README.md' are removed.
+
+    The new 'before' folder is staged next to the current one (files are copied, so the two folders never share a file) and
+    swapped in with two renames, and the 'after' files are only removed once the swap is done. A crash at any point therefore
+    leaves either the old or the new 'before' folder in place, and the next call finishes or rolls back the interrupted sync.
+    When the 'after' folder holds no records file (e.g. it was already synced), nothing is done.
+
+    Parameters:
+        - before_path (str): The 'before' folder.
+        - after_path (str): The 'after' folder.
+    """
+    with span('sync') as stage:
+        _recover_sync(before_path)
+        if not glob.glob(os.path.join(after_path, '*_records.csv')):
+            # Already synced: swapping would replace the records of the 'before' folder by nothing
+            logging.info(f'No records file in {after_path}, nothing to sync.')
+            stage.set(files=0)
+            return
+        stage.set(files=_swap_folders(before_path, after_path))
+
+
+def file_hash(path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's content.
+
+    Parameters:
+        - path (str): Path of the file.
+
+    Returns:
+        - str: The hex digest.
+    """
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def write_manifest(folder: str) -> dict:
+    """
+    Writes the content hash of every records CSV file of a folder to the folder's manifest file.
+
+    The manifest is written at scrape time and moved along with the CSV files by sync_folders, so that comparing the manifests of
+    'data/data_before' and 'data/data_after' is enough to know which files changed.
+
+    Parameters:
+        - folder (str): The folder containing the records CSV files.
+
+    Returns:
+        - dict: A mapping from file name to content hash.
+    """
+    manifest = {os.path.basename(path): file_hash(path) for path in sorted(glob.glob(os.path.join(folder, '*_records.csv')))}
+    with open(os.path.join(folder, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(folder: str) -> dict:
+    """
+    Reads the manifest of a folder. If the folder has no manifest (e.g. data scraped before manifests existed), the files are hashed.
+
+    Parameters:
+        - folder (str): The folder containing the records CSV files.
+
+    Returns:
+        - dict: A mapping from file name to content hash.
+    """
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {os.path.basename(path): file_hash(path) for path in sorted(glob.glob(os.path.join(folder, '*_records.csv')))}
+
+
+def changed_files(before_path: str = 'data/data_before', after_path: str = 'data/data_after') -> set:
+    """
+    Returns the records CSV files whose content differs between the 'before' and 'after' folders, according to their manifests.
+
+    A file missing from the 'after' folder was not scraped (e.g. the folders were already synced) and is not a change, so that
+    running the diff or the bot again after a sync does nothing.
+
+    Parameters:
+        - before_path (str): Folder containing the previous records CSV files.
+        - after_path (str): Folder containing the new records CSV files.
+
+    Returns:
+        - set: The names of the files of the 'after' folder that were added or modified.
+    """
+    before = load_manifest(before_path)
+    after = load_manifest(after_path)
+    return {name for name in after if before.get(name) != after[name]}
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+This module provides a browser-free way of fetching the World Athletics record tables over plain HTTP.
+
+The records pages are server-rendered Next.js pages: the default (women's) table is already part of the HTML returned by the server,
+so fetching the page with a pooled HTTP session is enough for it. Selenium only needs to be started when this fails, and for the
+men's table, which is only rendered once its tab is clicked.
+
+The base URL is a parameter everywhere, so the functions can be pointed at a local server serving saved pages for offline use.
+
+Functions:
+- create_session(pool_size): Creates a requests Session with a connection pool and retries on transient errors.
+- fetch_page(session, url): Downloads a records page and returns its HTML.
+- fetch_page_if_modified(session, url, etag, last_modified): Downloads a records page unless it is unchanged since a cached copy.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+############################################################################################################
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"}
+TIMEOUT = 15
+
+############################################################################################################
+
+def create_session(pool_size: int = 16) -> requests.Session:
+    """
+    Creates a requests Session with a connection pool and automatic retries on transient errors.
+
+    Parameters:
+        - pool_size (int): Maximum number of pooled connections per host.
+
+    Returns:
+        - requests.Session: The configured session.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def fetch_page(session: requests.Session, url: str) -> str:
+    """
+    Downloads a records page.
+
+    Parameters:
+        - session (requests.Session): The HTTP session to use.
+        - url (str): The URL of the page.
+
+    Returns:
+        - str: The HTML of the page.
+
+    Exceptions:
+        - requests.HTTPError: If the server answers with an error status.
+    """
+    response = session.get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_page_if_modified(session: requests.Session, url: str, etag: str = None, last_modified: str = None) -> tuple:
+    """
+    Downloads a records page with a conditional request, so that an unchanged page is not downloaded again.
+
+    Parameters:
+        - session (requests.Session): The HTTP session to use.
+        - url (str): The URL of the page.
+        - etag (str): The ETag of the cached copy of the page, if any.
+        - last_modified (str): The Last-Modified header of the cached copy of the page, if any.
+
+    Returns:
+        - tuple: (content, etag, last_modified), content being None if the server answered '304 Not Modified'.
+
+    Exceptions:
+        - requests.HTTPError: If the server answers with an error status.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response = session.get(url, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    content = None if response.status_code == 304 else response.text
+    return content, response.headers.get('ETag', etag), response.headers.get('Last-Modified', last_modified)
@@ -0,0 +1,184 @@
+"""
+This module provides the structured timing metrics of the World Athletics Records project.
+
+The stages of a run (driver start, page load, cookie dismissal, parse, diff, render, post, sync) are wrapped in spans, which
+measure their duration and carry counters such as the number of rows, bytes or retries. Each finished span is appended as one JSON
+line to 'log/metrics.jsonl', tagged with the run it belongs to, so that runs can be compared over time. At the end of a run, the
+spans can also be summarized in a Prometheus text-format file (e.g. for the node_exporter textfile collector).
+
+Spans are always measured, but only written once an entry point has called setup_metrics(), so that library code and benchmarks
+have no side effect on the log folder.
+
+Functions:
+- setup_metrics(path, prometheus_path): Starts writing the spans of this run to a JSON lines file (and a Prometheus file).
+- span(stage, **fields): Context manager measuring a stage; yields the span, whose counters can be updated.
+- write_prometheus(path): Writes the per-stage totals of this run in the Prometheus text format.
+- summarize(path, runs): Returns the total duration of each stage for the last runs recorded in a JSON lines file.
+
+Usage:
+    python instrumentation.py [--runs N]   # per-stage durations of the last N runs
+
+    with span('parse', bytes=len(content)) as s:
+        rows = parse_table_rows(content)
+        s.set(rows=len(rows))
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+############################################################################################################
+
+METRICS_PATH = 'log/metrics.jsonl'
+PROMETHEUS_PREFIX = 'world_athletics_records'
+RUN_ID = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+
+_lock = threading.Lock()
+_spans = []
+_config = {'path': None, 'prometheus_path': None}
+
+############################################################################################################
+
+class Span:
+    """
+    A measured stage, with its numeric counters (rows, bytes, retries, ...) and descriptive fields (url, sex, ...).
+    """
+
+    def __init__(self, stage: str, fields: dict):
+        self.stage = stage
+        self.fields = fields
+
+    def set(self, **fields) -> None:
+        """
+        Sets fields of the span.
+        """
+        self.fields.update(fields)
+
+    def add(self, name: str, value: float = 1) -> None:
+        """
+        Increments a counter of the span.
+        """
+        self.fields[name] = self.fields.get(name, 0) + value
+
+
+def setup_metrics(path: str = METRICS_PATH, prometheus_path: str = None) -> None:
+    """
+    Starts writing the spans of this run to a JSON lines file and, at the end of the run, to a Prometheus text-format file.
+
+    Parameters:
+        - path (str): Path of the JSON lines file, to which one line is appended per span.
+        - prometheus_path (str): Path of the Prometheus file written by write_prometheus(), or None for no Prometheus file.
+    """
+    _config['path'] = path
+    _config['prometheus_path'] = prometheus_path
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Measures the duration of a stage. An exception raised inside the span is recorded (status 'error') and re-raised.
+
+    Parameters:
+        - stage (str): Name of the stage (e.g. 'parse').
+        - **fields: Initial fields of the span (e.g. url='...', rows=0).
+
+    Yields:
+        - Span: The span, whose fields can be updated until it ends.
+    """
+    current = Span(stage, fields)
+    started = time.time()
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield current
+    except BaseException as e:
+        status = 'error'
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        record = {'ts': datetime.fromtimestamp(started, timezone.utc).isoformat(timespec='milliseconds'), 'run': RUN_ID,
+                  'stage': stage, 'duration_s': round(time.perf_counter() - start, 6), 'status': status,
+                  'thread': threading.current_thread().name, **current.fields}
+        with _lock:
+            _spans.append(record)
+            if _config['path']:
+                with open(_config['path'], 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+
+def write_prometheus(path: str = None) -> None:
+    """
+    Writes the per-stage totals of the spans of this run (count, errors, duration and numeric counters) in the Prometheus text
+    format. The file is replaced atomically, so that a collector never reads it half-written.
+
+    Parameters:
+        - path (str): Path of the file. Defaults to the one given to setup_metrics(); nothing is written if there is none.
+    """
+    path = path or _config['prometheus_path']
+    if not path:
+        return
+
+    with _lock:
+        spans = list(_spans)
+    totals = {}
+    for record in spans:
+        stage = totals.setdefault(record['stage'], {'count': 0, 'errors': 0, 'duration_seconds': 0.0})
+        stage['count'] += 1
+        stage['errors'] += record['status'] == 'error'
+        stage['duration_seconds'] += record['duration_s']
+        for name, value in record.items():
+            if name not in ('duration_s', 'status') and isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage[f'{name}_total'] = stage.get(f'{name}_total', 0) + value
+
+    lines = [f'# TYPE {PROMETHEUS_PREFIX}_run_timestamp_seconds gauge',
+             f'{PROMETHEUS_PREFIX}_run_timestamp_seconds {time.time():.3f}']
+    for metric in sorted({name for stage in totals.values() for name in stage}):
+        lines.append(f'# TYPE {PROMETHEUS_PREFIX}_stage_{metric} gauge')
+        for stage, values in sorted(totals.items()):
+            if metric in values:
+                lines.append(f'{PROMETHEUS_PREFIX}_stage_{metric}{{stage="{stage}"}} {values[metric]:g}')
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+def summarize(path: str = METRICS_PATH, runs: int = 7) -> dict:
+    """
+    Returns the total duration of each stage for the last runs recorded in a JSON lines file.
+
+    Parameters:
+        - path (str): Path of the JSON lines file.
+        - runs (int): Number of runs to return, the most recent last.
+
+    Returns:
+        - dict: A mapping from run ID to a mapping from stage to total duration in seconds.
+    """
+    durations = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            stages = durations.setdefault(record['run'], {})
+            stages[record['stage']] = stages.get(record['stage'], 0.0) + record['duration_s']
+    return dict(list(durations.items())[-runs:])
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the per-stage durations of the last runs.")
+    parser.add_argument("--path", default=METRICS_PATH, help="JSON lines file of the spans.")
+    parser.add_argument("--runs", type=int, default=7, help="Number of runs to show.")
+    args = parser.parse_args()
+
+    for run, stages in summarize(args.path, args.runs).items():
+        print(run)
+        for stage, duration in sorted(stages.items(), key=lambda item: -item[1]):
+            print(f"    {stage:20s} {duration:10.3f} s")
@@ -0,0 +1,26 @@
+"""
+This module configures the logging of the World Athletics Records project.
+
+Library modules only create log records; the entry points (cli.py, bot.py, web_scraping.py, ...) call setup_logging() once, so
+that importing a module has no side effect.
+
+Functions:
+- setup_logging(filename): Appends the log records to 'log/log.log'.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import logging
+
+############################################################################################################
+
+def setup_logging(filename: str = 'log/log.log') -> None:
+    """
+    Configures the root logger to append INFO records to a log file.
+
+    Parameters:
+        - filename (str): Path of the log file.
+    """
+    logging.basicConfig(filename=filename, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
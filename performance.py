@@ -0,0 +1,121 @@
+"""
+This module converts the free-form performances of the World Athletics Records project to comparable numbers.
+
+A performance is stored on the site as text ("9.58", "1:43.98", "2:00:35", "8.95", "8521", sometimes followed by a marker such as
+"!"). Depending on the discipline it is a time, a distance or a number of points, and a better record is a lower time but a higher
+distance or score. All functions work on whole columns at once, so that diffs, rankings and margins are array operations.
+
+Functions:
+- perf_values(perf): Converts performances to seconds, metres or points.
+- discipline_direction(discipline): Returns the unit of a discipline and whether a lower performance is better.
+- add_perf_columns(records): Adds the 'PERF_VALUE' and 'LOWER_IS_BETTER' columns to a records DataFrame.
+- add_improvement(diff): Adds the 'LOWER_IS_BETTER' and 'IMPROVEMENT' columns to a diff DataFrame.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+from functools import lru_cache
+import re
+
+import numpy as np
+import pandas as pd
+
+############################################################################################################
+
+PERF_PATTERN = r'(\d+(?::\d+){0,2}(?:\.\d+)?)'
+POINTS_PATTERN = re.compile(r'athlon')
+METRES_PATTERN = re.compile(r'Jump|Vault|Throw|Shot Put|One Hour')
+
+############################################################################################################
+
+def perf_values(perf: pd.Series) -> np.ndarray:
+    """
+    Converts performances to numbers: times ("h:mm:ss", "m:ss.xx" or "ss.xx") to seconds, distances to metres and scores to points.
+
+    Parameters:
+        - perf (pd.Series): The performances as text.
+
+    Returns:
+        - np.ndarray: The numeric performances (NaN when a performance cannot be parsed).
+    """
+    if perf.empty:
+        return np.empty(0)
+    parts = perf.astype(str).str.extract(PERF_PATTERN, expand=False).str.split(':', expand=True).astype(float)
+    value = np.zeros(len(perf))
+    # Parts are left-aligned: each present part shifts the previous ones by one sexagesimal position
+    for column in parts.columns:
+        part = parts[column].to_numpy()
+        value = np.where(np.isnan(part), value, value * 60 + part)
+    value[parts[0].isna().to_numpy()] = np.nan
+    return value
+
+
+@lru_cache(maxsize=None)
+def discipline_direction(discipline: str) -> tuple:
+    """
+    Returns the unit of the performances of a discipline and whether a lower performance is better.
+
+    Parameters:
+        - discipline (str): The discipline name (e.g. '100 Metres', 'Pole Vault', 'Decathlon').
+
+    Returns:
+        - tuple: (unit, lower_is_better), unit being 'points', 'metres' or 'seconds'.
+    """
+    if POINTS_PATTERN.search(discipline):
+        return 'points', False
+    if METRES_PATTERN.search(discipline):
+        return 'metres', False
+    return 'seconds', True
+
+
+def lower_is_better(discipline: pd.Series) -> np.ndarray:
+    """
+    Returns, for each discipline, whether a lower performance is better.
+
+    Parameters:
+        - discipline (pd.Series): The discipline names.
+
+    Returns:
+        - np.ndarray: Boolean array.
+    """
+    discipline = discipline.astype(str)
+    directions = {d: discipline_direction(d)[1] for d in discipline.unique()}
+    return discipline.map(directions).to_numpy(dtype=bool)
+
+
+def add_perf_columns(records: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the numeric performance ('PERF_VALUE') and the comparison direction ('LOWER_IS_BETTER') to a records DataFrame.
+
+    Parameters:
+        - records (pd.DataFrame): A records DataFrame with 'DISCIPLINE' and 'PERF' columns.
+
+    Returns:
+        - pd.DataFrame: The same DataFrame, with the two additional columns.
+    """
+    records['PERF_VALUE'] = perf_values(records['PERF'])
+    records['LOWER_IS_BETTER'] = lower_is_better(records['DISCIPLINE'])
+    return records
+
+
+def add_improvement(diff: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the comparison direction ('LOWER_IS_BETTER') and the margin between the new and the previous record ('IMPROVEMENT') to a
+    diff DataFrame with 'PERF_VALUE_before' and 'PERF_VALUE_after' columns.
+
+    The improvement is positive when the new record is better, zero for a tie or a correction of the other fields, negative for a
+    downward correction, and NaN for added or removed records.
+
+    Parameters:
+        - diff (pd.DataFrame): The diff DataFrame.
+
+    Returns:
+        - pd.DataFrame: The same DataFrame, with the two additional columns.
+    """
+    diff['LOWER_IS_BETTER'] = lower_is_better(diff['DISCIPLINE'])
+    margin = diff['PERF_VALUE_after'].to_numpy(dtype=float) - diff['PERF_VALUE_before'].to_numpy(dtype=float)
+    # Adding 0.0 turns the -0.0 of unchanged lower-is-better performances into 0.0
+    diff['IMPROVEMENT'] = np.where(diff['LOWER_IS_BETTER'], -margin, margin).round(6) + 0.0
+    return diff
@@ -0,0 +1,96 @@
+"""
+This module groups the record changes of the World Athletics Records project that belong to the same performance.
+
+A new world record is often also a new area record and a new Olympic record, so the same performance shows up as one change in
+each of the sex/category files. The changes are collapsed, in a single pass over the diff, into one event per (sex, discipline,
+competitor, date), labelled with the abbreviations of the categories whose record changed with it (e.g. "WR + AR + OR"), so that
+a single tweet announces it. Only the categories changed in this diff make up the label: a category whose record the performance
+already held is not announced again.
+
+The event keeps the row of its most important category (world, then area, then Olympic), whose previous record is the one shown in
+the tweet. Removed records are never grouped: each one stays an event of its own, rendered as a removal (see
+data_utils.render_fields).
+
+Functions:
+- group_changes(df): Collapses the changes of a diff DataFrame into one row per performance.
+- group_record_changes(df): Groups the changes of a diff DataFrame, measured as the 'group' stage.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import pandas as pd
+
+from instrumentation import span
+
+############################################################################################################
+
+AREA_CATEGORIES = ['african', 'asian', 'european', 'nacac', 'oceanian', 'south_american']
+CATEGORY_ABBREVIATIONS = {'world': 'WR', 'olympic_games': 'OR', **{category: 'AR' for category in AREA_CATEGORIES}}
+# Order of the categories in an event label, and choice of the row kept for an event
+CATEGORY_RANK = {category: rank for rank, category in enumerate(['world', *AREA_CATEGORIES, 'olympic_games'])}
+
+############################################################################################################
+
+def _keys(df: pd.DataFrame) -> list:
+    """
+    Returns the (sex, discipline, competitor, date) key of each row, missing values being empty strings.
+    """
+    return list(zip(*(df[column].astype(object).where(df[column].notna(), '').astype(str) for column in df.columns)))
+
+
+def _label(categories: tuple) -> str:
+    """
+    Returns the label of an event held in several categories (e.g. 'WR + AR + OR'), or an empty string for a single category.
+    """
+    if len(categories) < 2:
+        return ''
+    return ' + '.join(dict.fromkeys(CATEGORY_ABBREVIATIONS[category] for category in categories))
+
+
+def group_changes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses the changes of a diff DataFrame into one row per new performance (same sex, discipline, competitor and date).
+
+    Parameters:
+        - df (pd.DataFrame): A diff DataFrame, as returned by data_analysis.generate_diff_dataframes.
+
+    Returns:
+        - pd.DataFrame: One row per event, in the order of the first change of each event, with the row of its most important
+          category and an additional 'CATEGORIES' column: the label of the categories changed by the event (e.g. 'WR + AR + OR'),
+          or an empty string when it only changed one.
+    """
+    if df.empty:
+        return df.assign(CATEGORIES=pd.Series(dtype=object))
+
+    work = df.reset_index(drop=True)
+    keys = _keys(work[['SEX', 'DISCIPLINE', 'COMPETITOR_after', 'DATE_after']])
+    # Groups are numbered in order of first appearance; removed records are events of their own
+    group_ids = {}
+    groups = [group_ids.setdefault(('removed', i) if change == 'removed' else key, len(group_ids))
+              for i, (key, change) in enumerate(zip(keys, work['CHANGE_TYPE']))]
+
+    work['_GROUP'] = groups
+    work['_RANK'] = work['CATEGORY'].map(CATEGORY_RANK)
+    changed = work.groupby('_GROUP')['CATEGORY'].agg(tuple)
+    # Keeping the most important row of each group and sorting by group keeps the order of the changes
+    events = work.sort_values('_RANK', kind='stable').drop_duplicates('_GROUP').sort_values('_GROUP')
+    events['CATEGORIES'] = [_label(sorted(set(changed[group]), key=CATEGORY_RANK.get)) for group in events['_GROUP']]
+    return events.drop(columns=['_GROUP', '_RANK']).reset_index(drop=True)
+
+
+def group_record_changes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Groups the changes of a diff DataFrame (see group_changes), measured as the 'group' stage (see instrumentation).
+
+    Parameters:
+        - df (pd.DataFrame): A diff DataFrame, as returned by data_analysis.generate_diff_dataframes.
+
+    Returns:
+        - pd.DataFrame: One row per event, with an additional 'CATEGORIES' column.
+    """
+    with span('group', rows=len(df)) as stage:
+        events = group_changes(df)
+        stage.set(events=len(events))
+    return events
@@ -0,0 +1,216 @@
+"""
+This module maintains an append-only history of the record changes of the World Athletics Records project.
+
+Every daily run appends one JSON line per changed record (added, removed or changed) to an event log, together with the run
+timestamp, so a run only writes its delta. Every CHECKPOINT_INTERVAL runs, the full state of the records is saved as a record
+store checkpoint (see record_store). An index file lists the checkpoints and runs with their byte offsets in the event log, so the
+state of the records as of any date is rebuilt from the closest checkpoint by reading only the events recorded after it.
+
+Each event holds the previous values of a removed or changed record, and a record is found by these values among those of its
+(sex, category, discipline), so that tied records stay addressable even when the table order of a discipline shifts (e.g. when
+the first of two tied records leaves the table). Added records are inserted at their occurrence, i.e. their index among the
+records of their discipline (see data_analysis.diff_records).
+
+Functions:
+- append_changes(df, snapshot_folder, history_path, before_folder): Appends the changes of a diff DataFrame to the event log.
+- state_as_of(as_of, history_path): Rebuilds the records of every sex/category pair as of a given date.
+
+Usage:
+    python record_history.py 2024-08-01
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import sys
+
+import pandas as pd
+
+from data_analysis import RECORD_COLUMNS, VALUE_COLUMNS, load_records
+from record_store import PARTITIONS, STORE_NAME, read_store, write_store
+
+############################################################################################################
+
+HISTORY_PATH = 'data/history'
+EVENTS_NAME = 'events.jsonl'
+INDEX_NAME = 'index.json'
+CHECKPOINT_INTERVAL = 30
+
+############################################################################################################
+
+def _load_index(history_path: str) -> dict:
+    """
+    Reads the history index, or returns an empty one.
+    """
+    try:
+        with open(os.path.join(history_path, INDEX_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'checkpoints': [], 'runs': []}
+
+
+def _save_index(index: dict, history_path: str) -> None:
+    """
+    Atomically replaces the history index.
+    """
+    path = os.path.join(history_path, INDEX_NAME)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(f'{path}.tmp', path)
+
+
+def _write_checkpoint(folder: str, timestamp: str, offset: int, run: int, index: dict, history_path: str) -> None:
+    """
+    Saves the records of a snapshot folder as a checkpoint valid at the given event log offset (i.e. after `run` runs).
+    """
+    name = f"checkpoint_{timestamp.replace(':', '').replace('-', '')}"
+    os.makedirs(os.path.join(history_path, name), exist_ok=True)
+    write_store(load_records(folder, PARTITIONS), os.path.join(history_path, name, STORE_NAME))
+    index['checkpoints'].append({'timestamp': timestamp, 'offset': offset, 'run': run, 'folder': name})
+
+
+def _events(df: pd.DataFrame, timestamp: str) -> list:
+    """
+    Converts a diff DataFrame (see data_analysis.generate_diff_dataframes) to event log lines.
+    """
+    lines = []
+    for row in df.itertuples(index=False):
+        row = row._asdict()
+        before = None if row['CHANGE_TYPE'] == 'added' else {col: _value(row[f'{col}_before']) for col in VALUE_COLUMNS}
+        after = None if row['CHANGE_TYPE'] == 'removed' else {col: _value(row[f'{col}_after']) for col in VALUE_COLUMNS}
+        event = {'ts': timestamp, 'sex': row['SEX'], 'category': row['CATEGORY'], 'discipline': row['DISCIPLINE'],
+                 'occ': int(row['OCCURRENCE']), 'type': row['CHANGE_TYPE'], 'before': before, 'after': after}
+        lines.append(json.dumps(event, ensure_ascii=False) + '\n')
+    return lines
+
+
+def _position(records: list, event: dict):
+    """
+    Returns the position, among the records of a discipline, of the record a removed or changed event applies to, or None.
+
+    The record is the first one with the previous values of the event; events written without them are located by occurrence.
+    """
+    if event.get('before') is None:
+        return event['occ'] if event['occ'] < len(records) else None
+    return next((i for i, record in enumerate(records) if record == event['before']), None)
+
+
+def _value(value):
+    """
+    Returns a JSON-serializable value, with missing values as None.
+    """
+    return None if pd.isna(value) else str(value)
+
+
+def append_changes(df: pd.DataFrame, snapshot_folder: str = 'data/data_after', history_path: str = HISTORY_PATH,
+                   before_folder: str = 'data/data_before') -> None:
+    """
+    Appends the changes of a diff DataFrame to the event log and, when due, writes a checkpoint.
+
+    On the first call, the state before the changes (`before_folder`) is checkpointed so that the history is complete. A
+    checkpoint of the snapshot folder is then written every CHECKPOINT_INTERVAL runs. The index is updated last, so events written
+    by an interrupted run are ignored (and overwritten) by the next one.
+
+    Parameters:
+        - df (pd.DataFrame): The diff DataFrame, as returned by data_analysis.generate_diff_dataframes.
+        - snapshot_folder (str): The folder holding the records after the changes.
+        - history_path (str): The history folder.
+        - before_folder (str): The folder holding the records before the changes, checkpointed on the first call.
+    """
+    os.makedirs(history_path, exist_ok=True)
+    index = _load_index(history_path)
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    events_path = os.path.join(history_path, EVENTS_NAME)
+
+    # Offset of the end of the last committed run; anything after it comes from an interrupted run
+    offset = index['runs'][-1]['end'] if index['runs'] else 0
+    if not index['checkpoints']:
+        _write_checkpoint(before_folder, timestamp, offset, len(index['runs']), index, history_path)
+
+    with open(events_path, 'ab') as f:
+        f.truncate(offset)
+        f.write(''.join(_events(df, timestamp)).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+        end = f.tell()
+
+    index['runs'].append({'timestamp': timestamp, 'start': offset, 'end': end, 'events': len(df)})
+    if len(index['runs']) - index['checkpoints'][-1]['run'] >= CHECKPOINT_INTERVAL:
+        _write_checkpoint(snapshot_folder, timestamp, end, len(index['runs']), index, history_path)
+    _save_index(index, history_path)
+    logging.info(f"{len(df)} record changes appended to the history.")
+
+
+def _parse_date(value: str) -> datetime:
+    """
+    Parses an ISO date or datetime. A date alone means the end of that day, and naive values are taken as UTC.
+    """
+    parsed = datetime.fromisoformat(value)
+    if len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def state_as_of(as_of: str, history_path: str = HISTORY_PATH) -> dict:
+    """
+    Rebuilds the records of every sex/category pair as of a given date, from the closest earlier checkpoint and the events
+    recorded after it.
+
+    Records that were added after the checkpoint are listed at their occurrence among the records of their discipline, and
+    disciplines that appeared after the checkpoint after the other disciplines of their sex/category pair.
+
+    Parameters:
+        - as_of (str): ISO date (e.g. '2024-08-01', meaning the end of that day) or datetime.
+        - history_path (str): The history folder.
+
+    Returns:
+        - dict: A mapping from partition name (e.g. 'men_world') to records DataFrame.
+
+    Exceptions:
+        - ValueError: If the history starts after the requested date.
+    """
+    limit = _parse_date(as_of)
+    index = _load_index(history_path)
+    checkpoints = [c for c in index['checkpoints'] if _parse_date(c['timestamp']) <= limit]
+    if not checkpoints:
+        raise ValueError(f"No record history before {as_of}.")
+    checkpoint = checkpoints[-1]
+    end = index['runs'][-1]['end'] if index['runs'] else 0
+
+    # discipline -> records, per partition, in table order
+    state = {}
+    for name, records in read_store(os.path.join(history_path, checkpoint['folder'])).items():
+        disciplines = state.setdefault(name, {})
+        for discipline, record in zip(records['DISCIPLINE'].astype(str), records[VALUE_COLUMNS].to_dict('records')):
+            disciplines.setdefault(discipline, []).append({col: _value(value) for col, value in record.items()})
+
+    with open(os.path.join(history_path, EVENTS_NAME), 'rb') as f:
+        f.seek(checkpoint['offset'])
+        while f.tell() < end:
+            event = json.loads(f.readline())
+            if _parse_date(event['ts']) > limit:
+                break
+            records = state.setdefault(f"{event['sex']}_{event['category']}", {}).setdefault(event['discipline'], [])
+            position = None if event['type'] == 'added' else _position(records, event)
+            if event['type'] == 'removed':
+                if position is not None:
+                    records.pop(position)
+            elif position is not None:
+                records[position] = event['after']
+            else:
+                records.insert(event['occ'], event['after'])
+
+    return {name: pd.DataFrame([{'DISCIPLINE': d, **record} for d, records in disciplines.items() for record in records],
+                               columns=RECORD_COLUMNS)
+            for name, disciplines in state.items()}
+
+
+if __name__ == "__main__":
+    for partition, partition_records in state_as_of(sys.argv[1]).items():
+        print(f"\n{partition} ({len(partition_records)} records)")
+        print(partition_records.to_string(index=False))
@@ -0,0 +1,168 @@
+"""
+This module provides an in-memory index over the current records of the World Athletics Records project, to answer questions such
+as "all current records held by KEN" or "every area record for 800 Metres" without scanning the record files.
+
+The records of every sex/category pair are loaded once (from the record store when there is one, else from the CSV files), and
+hash indexes on COMPETITOR, COUNTRY and DISCIPLINE and a sorted index on the record date are built over them. Lookups only touch
+the matching rows. `refresh()` reloads the pairs whose content hash changed since the last load.
+
+Usage:
+    python record_index.py --country KEN
+    python record_index.py --discipline "800 Metres" --sex women
+    python record_index.py --since 2024-01-01 --until 2024-12-31
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import argparse
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+
+import pandas as pd
+
+from data_analysis import RECORD_COLUMNS, load_records
+from file_operations import load_manifest
+from record_store import PARTITIONS, RECORD_CATEGORIES, SEX_CATEGORIES
+
+############################################################################################################
+
+INDEXED_COLUMNS = ['COMPETITOR', 'COUNTRY', 'DISCIPLINE']
+DATE_FORMAT = '%d %b %Y'
+
+############################################################################################################
+
+class RecordIndex:
+    """
+    In-memory index over the records of a snapshot folder.
+
+    Records are returned as dicts with the record columns plus 'SEX', 'CATEGORY' and 'RECORD_DATE' (a datetime.date).
+
+    Parameters:
+        - folder (str): The snapshot folder holding the current records.
+    """
+
+    def __init__(self, folder: str = 'data/data_before'):
+        self.folder = folder
+        self._partitions = {}
+        self._hashes = {}
+        self.refresh()
+
+    def refresh(self) -> list:
+        """
+        Reloads the sex/category pairs whose content hash changed since the last load, and rebuilds the indexes if needed.
+
+        Returns:
+            - list: The names of the reloaded partitions.
+        """
+        manifest = load_manifest(self.folder)
+        hashes = {name: manifest.get(f'{name}_records.csv') for name in PARTITIONS}
+        stale = [name for name in PARTITIONS if hashes[name] is not None and hashes[name] != self._hashes.get(name)]
+        if stale:
+            for name, records in load_records(self.folder, stale).items():
+                self._partitions[name] = self._rows(name, records)
+            self._hashes.update({name: hashes[name] for name in stale})
+            self._build()
+        return stale
+
+    @staticmethod
+    def _rows(name: str, records: pd.DataFrame) -> list:
+        """
+        Converts the records of one partition to row dicts.
+        """
+        sex, category = name.split('_', 1)
+        records = records[RECORD_COLUMNS].astype(object).where(records[RECORD_COLUMNS].notna(), None)
+        dates = pd.to_datetime(records['DATE'], format=DATE_FORMAT, errors='coerce').dt.date
+        return [{**row, 'SEX': sex, 'CATEGORY': category, 'RECORD_DATE': None if pd.isna(d) else d}
+                for row, d in zip(records.to_dict('records'), dates)]
+
+    def _build(self) -> None:
+        """
+        Rebuilds the hash and date indexes over all loaded rows.
+        """
+        self.rows = [row for name in PARTITIONS for row in self._partitions.get(name, [])]
+        self._hash_indexes = {column: defaultdict(list) for column in INDEXED_COLUMNS + ['SEX', 'CATEGORY']}
+        for i, row in enumerate(self.rows):
+            for column, index in self._hash_indexes.items():
+                if row[column] is not None:
+                    index[str(row[column]).casefold()].append(i)
+
+        dated = sorted((row['RECORD_DATE'], i) for i, row in enumerate(self.rows) if row['RECORD_DATE'] is not None)
+        self._dates = [d for d, _ in dated]
+        self._date_rows = [i for _, i in dated]
+
+    def _lookup(self, column: str, value: str) -> list:
+        return self._hash_indexes[column].get(value.casefold(), [])
+
+    def by_competitor(self, competitor: str) -> list:
+        """Returns the records held by a competitor (athlete or relay team), case-insensitively."""
+        return [self.rows[i] for i in self._lookup('COMPETITOR', competitor)]
+
+    def by_country(self, country: str) -> list:
+        """Returns the records held by a country, given by its code (e.g. 'KEN')."""
+        return [self.rows[i] for i in self._lookup('COUNTRY', country)]
+
+    def by_discipline(self, discipline: str) -> list:
+        """Returns the records of a discipline (e.g. '800 Metres') across all sexes and categories."""
+        return [self.rows[i] for i in self._lookup('DISCIPLINE', discipline)]
+
+    def between(self, since: date = None, until: date = None) -> list:
+        """Returns the records set between two dates (both included, either may be None), oldest first."""
+        start = 0 if since is None else bisect_left(self._dates, since)
+        end = len(self._dates) if until is None else bisect_right(self._dates, until)
+        return [self.rows[i] for i in self._date_rows[start:end]]
+
+    def query(self, competitor: str = None, country: str = None, discipline: str = None, sex: str = None, category: str = None,
+              since: date = None, until: date = None) -> list:
+        """
+        Returns the records matching all the given criteria, in table order (sex, category, then table row).
+
+        Parameters:
+            - competitor, country, discipline, sex, category (str): Values to match exactly (case-insensitively).
+            - since, until (datetime.date): Bounds on the record date, both included.
+
+        Returns:
+            - list: The matching records.
+        """
+        candidates = None
+        for column, value in (('COMPETITOR', competitor), ('COUNTRY', country), ('DISCIPLINE', discipline), ('SEX', sex),
+                              ('CATEGORY', category)):
+            if value is not None:
+                matches = set(self._lookup(column, value))
+                candidates = matches if candidates is None else candidates & matches
+        if since is not None or until is not None:
+            start = 0 if since is None else bisect_left(self._dates, since)
+            end = len(self._dates) if until is None else bisect_right(self._dates, until)
+            matches = set(self._date_rows[start:end])
+            candidates = matches if candidates is None else candidates & matches
+        if candidates is None:
+            return list(self.rows)
+        return [self.rows[i] for i in sorted(candidates)]
+
+
+############################################################################################################
+##############################                Command line                ##################################
+############################################################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the current World Athletics records.")
+    parser.add_argument("--folder", default="data/data_before", help="Snapshot folder holding the current records.")
+    parser.add_argument("--athlete", dest="competitor", help="Competitor (athlete or relay team) name.")
+    parser.add_argument("--country", help="Country code, e.g. KEN.")
+    parser.add_argument("--discipline", help="Discipline, e.g. '800 Metres'.")
+    parser.add_argument("--sex", choices=SEX_CATEGORIES)
+    parser.add_argument("--category", choices=RECORD_CATEGORIES)
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(), help="First record date (YYYY-MM-DD).")
+    parser.add_argument("--until", type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(), help="Last record date (YYYY-MM-DD).")
+    args = vars(parser.parse_args())
+
+    index = RecordIndex(args.pop("folder"))
+    results = index.query(**args)
+    if results:
+        print(pd.DataFrame(results).drop(columns=['RECORD_DATE']).to_string(index=False))
+    print(f"\n{len(results)} records found.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+This module implements the columnar record store of the World Athletics Records project.
+
+A snapshot of all records (2 sexes x 8 categories) is stored as a single uncompressed Arrow IPC (Feather v2) file, 'records.arrow',
+next to the CSV files of the snapshot folder. Each sex/category pair is written as its own record batch, in the order of
+PARTITIONS, so that one partition can be read from the memory-mapped file without touching the others. Low-cardinality text columns are dictionary-encoded (pandas categoricals), and the record and birth dates are also
+stored as typed date columns (the birth date is null when only the year is known). The numeric performance and its comparison
+direction (see performance) are computed once, when the store is written.
+
+Functions:
+- csv_to_store(folder): Converts the records CSV files of a snapshot folder to the folder's record store.
+- write_store(partitions, path): Writes a dict of records DataFrames, keyed by partition name, to a record store file.
+- read_store(folder, partitions): Reads partitions of a snapshot folder's record store through a memory map.
+
+Usage:
+    python record_store.py data/data_before data/data_after
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+from performance import add_perf_columns
+
+############################################################################################################
+
+STORE_NAME = 'records.arrow'
+SEX_CATEGORIES = ['men', 'women']
+RECORD_CATEGORIES = ['world', 'olympic_games', 'african', 'asian', 'european', 'nacac', 'oceanian', 'south_american']
+PARTITIONS = [f'{s}_{c}' for s in SEX_CATEGORIES for c in RECORD_CATEGORIES]
+
+DICTIONARY_COLUMNS = ['DISCIPLINE', 'COUNTRY', 'VENUE']
+DATE_FORMAT = '%d %b %Y'
+
+SCHEMA = pa.schema([
+    ('DISCIPLINE', pa.dictionary(pa.int16(), pa.string())),
+    ('PERF', pa.string()),
+    ('COMPETITOR', pa.string()),
+    ('DOB', pa.string()),
+    ('COUNTRY', pa.dictionary(pa.int16(), pa.string())),
+    ('VENUE', pa.dictionary(pa.int16(), pa.string())),
+    ('DATE', pa.string()),
+    ('BIRTH_DATE', pa.date32()),
+    ('RECORD_DATE', pa.date32()),
+    ('PERF_VALUE', pa.float64()),
+    ('LOWER_IS_BETTER', pa.bool_()),
+])
+
+############################################################################################################
+
+def _to_table(records: pd.DataFrame) -> pa.Table:
+    """
+    Converts a records DataFrame to a table with the store schema, adding the typed date and performance columns.
+    """
+    records = records[['DISCIPLINE', 'PERF', 'COMPETITOR', 'DOB', 'COUNTRY', 'VENUE', 'DATE']].astype('string')
+    records['BIRTH_DATE'] = pd.to_datetime(records['DOB'], format=DATE_FORMAT, errors='coerce').dt.date
+    records['RECORD_DATE'] = pd.to_datetime(records['DATE'], format=DATE_FORMAT, errors='coerce').dt.date
+    add_perf_columns(records)
+    return pa.Table.from_pandas(records, schema=SCHEMA, preserve_index=False)
+
+
+def write_store(partitions: dict, path: str) -> None:
+    """
+    Writes records DataFrames to a record store file, one record batch per partition.
+
+    All partitions share the same dictionaries (the IPC file format allows a single dictionary per column). The file is written to
+    a temporary name and then renamed, so that readers never see a partially written store.
+
+    Parameters:
+        - partitions (dict): A mapping from partition name (e.g. 'men_world') to the records DataFrame of that partition.
+        - path (str): Path of the record store file.
+    """
+    names = [name for name in PARTITIONS if name in partitions]
+    table = _to_table(pd.concat([partitions[name] for name in names], ignore_index=True)).combine_chunks()
+    schema = table.schema.with_metadata({'partitions': ','.join(names)})
+
+    tmp_path = f'{path}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        offset = 0
+        for name in names:
+            length = len(partitions[name])
+            for batch in table.slice(offset, length).to_batches():
+                writer.write_batch(batch)
+            offset += length
+    os.replace(tmp_path, path)
+
+
+def csv_to_store(folder: str) -> str:
+    """
+    Converts the records CSV files of a snapshot folder (e.g. 'data/data_after') to the folder's record store.
+
+    Parameters:
+        - folder (str): The snapshot folder.
+
+    Returns:
+        - str: Path of the written record store file.
+    """
+    partitions = {}
+    for name in PARTITIONS:
+        csv_path = os.path.join(folder, f'{name}_records.csv')
+        if os.path.exists(csv_path):
+            partitions[name] = pd.read_csv(csv_path)
+
+    path = os.path.join(folder, STORE_NAME)
+    write_store(partitions, path)
+    return path
+
+
+def read_store(folder: str, partitions: list = None) -> dict:
+    """
+    Reads partitions of a snapshot folder's record store through a memory map.
+
+    Only the requested record batches are converted to pandas; the text columns come back as strings (missing values as None),
+    the dictionary-encoded ones as categoricals and the typed date columns as datetime64.
+
+    Parameters:
+        - folder (str): The snapshot folder.
+        - partitions (list): Names of the partitions to read (e.g. ['men_world']). Defaults to all partitions.
+
+    Returns:
+        - dict: A mapping from partition name to records DataFrame.
+
+    Exceptions:
+        - FileNotFoundError: If the folder has no record store.
+    """
+    with pa.memory_map(os.path.join(folder, STORE_NAME), 'r') as source:
+        reader = pa.ipc.open_file(source)
+        names = reader.schema.metadata[b'partitions'].decode().split(',')
+        wanted = names if partitions is None else [name for name in names if name in partitions]
+        return {name: reader.get_batch(names.index(name)).to_pandas(date_as_object=False) for name in wanted}
+
+
+if __name__ == "__main__":
+    for snapshot_folder in sys.argv[1:] or ['data/data_before', 'data/data_after']:
+        print(f"Record store written to {csv_to_store(snapshot_folder)}")
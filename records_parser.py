@@ -0,0 +1,112 @@
+"""
+This module provides a streaming parser for the World Athletics records table.
+
+Instead of building a full document tree of the page, the HTML is fed to an event-based `html.parser.HTMLParser` that ignores
+everything until the records table starts, collects the text of each cell of its first `tbody`, and stops parsing as soon as the
+table is closed. The cell texts are the same as the `.text` of the corresponding BeautifulSoup `td` elements.
+
+Functions:
+- parse_table_rows(content): Returns the raw cell texts of every row of the records table.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+from html.parser import HTMLParser
+
+############################################################################################################
+
+TABLE_CLASS = 'Table_table__2zsdR RecordsTable_table__3X8lL'
+
+############################################################################################################
+
+class _TableEnd(Exception):
+    """
+    Raised by the parser to stop reading the page once the records table has been closed.
+    """
+
+
+class RecordsTableParser(HTMLParser):
+    """
+    Event-based parser collecting the cells of the first `tbody` of the records table.
+
+    Attributes:
+        - rows (list[list[str]]): The raw text of each cell, row by row.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._table_depth = 0
+        self._in_tbody = False
+        self._tbody_done = False
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._table_depth == 0:
+            if tag == 'table' and dict(attrs).get('class') == TABLE_CLASS:
+                self._table_depth = 1
+            return
+
+        if tag == 'table':
+            self._table_depth += 1
+        elif tag == 'tbody' and not self._tbody_done:
+            self._in_tbody = True
+        elif not self._in_tbody:
+            return
+        elif tag == 'tr':
+            self._close_cell()
+            self.rows.append([])
+        elif tag == 'td' and self.rows:
+            self._close_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self._table_depth == 0:
+            return
+
+        if tag == 'td' or tag == 'tr':
+            self._close_cell()
+        elif tag == 'tbody' and self._in_tbody:
+            self._close_cell()
+            self._in_tbody = False
+            self._tbody_done = True
+        elif tag == 'table':
+            self._table_depth -= 1
+            if self._table_depth == 0:
+                self._close_cell()
+                raise _TableEnd
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self.rows[-1].append(''.join(self._cell))
+            self._cell = None
+
+
+def parse_table_rows(content: str) -> list:
+    """
+    Returns the raw text of every cell of the records table, without building a document tree.
+
+    Parameters:
+        - content (str): HTML content.
+
+    Returns:
+        - list[list[str]]: One list of cell texts per table row.
+
+    Exceptions:
+        - ValueError: If the page contains no records table.
+    """
+    parser = RecordsTableParser()
+    try:
+        parser.feed(content)
+        parser.close()
+    except _TableEnd:
+        return parser.rows
+    if not parser._tbody_done:
+        raise ValueError("Records table not found in the page.")
+    return parser.rows
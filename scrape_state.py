@@ -0,0 +1,128 @@
+"""
+This module keeps the state that makes the scraping of the World Athletics Records project resumable.
+
+- PageCache: a local cache of the raw record pages, keyed by URL and sex. Each page is stored gzip-compressed, next to a small JSON
+  file holding its URL, sex, the backend that fetched it ('http' or 'selenium'), the time it was fetched and, for HTTP, its ETag
+  and Last-Modified headers, so that a stale page can be refreshed with a conditional request.
+- ScrapeCheckpoint: a checkpoint file listing the CSV files completed by the scraper, with the time they were written and their
+  content hash. A CSV file is only trusted if it is recent enough and still has the recorded hash, so that a rerun after a failure
+  only scrapes the pages that are missing or stale.
+
+Every file is written to a temporary file and renamed, so an interrupted run never leaves a truncated cache entry or checkpoint.
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from file_operations import file_hash
+
+############################################################################################################
+
+CACHE_PATH = 'data/cache/pages'
+CHECKPOINT_PATH = 'data/cache/scrape_checkpoint.json'
+
+############################################################################################################
+
+def _write_atomic(path: str, content: bytes) -> None:
+    """
+    Writes a file through a temporary file and a rename.
+    """
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(content)
+    os.replace(f'{path}.tmp', path)
+
+
+class PageCache:
+    """
+    Compressed cache of the raw record pages, keyed by URL and sex.
+
+    Attributes:
+        - folder (str): The folder of the cache entries.
+    """
+
+    def __init__(self, folder: str = CACHE_PATH):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, url: str, sex: str) -> str:
+        return os.path.join(self.folder, hashlib.sha256(f'{url}|{sex}'.encode()).hexdigest()[:32])
+
+    def get(self, url: str, sex: str) -> tuple:
+        """
+        Returns the cached page of a URL and sex.
+
+        Returns:
+            - tuple: (content, metadata), or (None, None) if the page is not cached. The metadata holds 'url', 'sex', 'backend',
+              'fetched_at' (epoch seconds), 'etag' and 'last_modified'.
+        """
+        path = self._path(url, sex)
+        try:
+            with open(f'{path}.json') as f:
+                metadata = json.load(f)
+            with gzip.open(f'{path}.html.gz', 'rt', encoding='utf-8') as f:
+                return f.read(), metadata
+        except (FileNotFoundError, json.JSONDecodeError, EOFError, gzip.BadGzipFile):
+            return None, None
+
+    def put(self, url: str, sex: str, content: str, backend: str, etag: str = None, last_modified: str = None) -> None:
+        """
+        Stores a page fetched now.
+        """
+        path = self._path(url, sex)
+        # The page is written before its metadata, so metadata always describes a complete page
+        _write_atomic(f'{path}.html.gz', gzip.compress(content.encode('utf-8'), compresslevel=6, mtime=0))
+        metadata = {'url': url, 'sex': sex, 'backend': backend, 'fetched_at': time.time(), 'etag': etag,
+                    'last_modified': last_modified}
+        _write_atomic(f'{path}.json', json.dumps(metadata).encode())
+
+    def touch(self, url: str, sex: str, metadata: dict) -> None:
+        """
+        Marks a cached page as fetched now, e.g. after the server answered a conditional request with '304 Not Modified'.
+        """
+        _write_atomic(f'{self._path(url, sex)}.json', json.dumps({**metadata, 'fetched_at': time.time()}).encode())
+
+
+class ScrapeCheckpoint:
+    """
+    Checkpoint of the CSV files completed by the scraper. Safe to use from several worker threads.
+
+    Attributes:
+        - path (str): Path of the checkpoint file.
+        - entries (dict): A mapping from CSV file to its 'url', 'sex', 'completed_at' (epoch seconds) and 'sha256'.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def is_fresh(self, csv_name: str, max_age: float) -> bool:
+        """
+        Returns whether a CSV file was completed less than `max_age` seconds ago and has not been modified since.
+        """
+        entry = self.entries.get(csv_name)
+        if entry is None or time.time() - entry['completed_at'] > max_age or not os.path.exists(csv_name):
+            return False
+        return file_hash(csv_name) == entry['sha256']
+
+    def mark(self, csv_name: str, url: str, sex: str) -> None:
+        """
+        Records a CSV file as completed now.
+        """
+        entry = {'url': url, 'sex': sex, 'completed_at': time.time(), 'sha256': file_hash(csv_name)}
+        with self.lock:
+            self.entries[csv_name] = entry
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            _write_atomic(self.path, json.dumps(self.entries, indent=2).encode())
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The modules of the project live at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name, mode='r'):
+    with open(os.path.join(FIXTURES, name), mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+        return f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves tests/fixtures/<page>.html at /<page> (dashes for underscores) with an ETag, answering '304 Not Modified' to a
+    matching If-None-Match and '404 Not Found' to any other path.
+    """
+
+    def do_GET(self):
+        path = os.path.join(FIXTURES, self.path.strip('/').replace('-', '_') + '.html')
+        if not os.path.isfile(path):
+            status, body, etag = 404, b'', None
+        else:
+            with open(path, 'rb') as f:
+                body = f.read()
+            etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            status = 304 if self.headers.get('If-None-Match') == etag else 200
+        self.server.statuses.append((self.path, status))
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        if status == 200:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body) if status == 200 else 0))
+        self.end_headers()
+        if status == 200:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    """
+    A local HTTP server of the saved pages; `statuses` lists the (path, status) of the requests it answered.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.statuses = []
+    server.base_url = f'http://127.0.0.1:{server.server_port}/'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from data_analysis import RECORD_COLUMNS, diff_records
+
+
+def records(*rows):
+    return pd.DataFrame([dict(zip(RECORD_COLUMNS, row)) for row in rows], columns=RECORD_COLUMNS)
+
+
+SPRINT = ('100 Metres', '9.58', 'Usain BOLT', '21 AUG 1986', 'JAM', 'Berlin (GER)', '16 AUG 2009')
+VAULT_A = ('Pole Vault', '5.06', 'Yelena ISINBAYEVA', '03 JUN 1982', 'RUS', 'Zürich (SUI)', '28 AUG 2009')
+VAULT_B = ('Pole Vault', '5.06', 'Someone ELSE', '01 JAN 1990', 'USA', 'Eugene, OR (USA)', '01 JUL 2024')
+MILE = ('Mile Road', '4:20.98', 'Diribe WELTEJI', '13 FEB 2002', 'ETH', 'Riga (LAT)', '01 OCT 2023')
+
+
+def test_identical_records_have_no_change():
+    assert diff_records(records(SPRINT, VAULT_A), records(SPRINT, VAULT_A)).empty
+
+
+def test_changed_added_and_removed_records():
+    new_sprint = ('100 Metres', '9.50', 'New ATHLETE', '01 JAN 2000', 'FRA', 'Paris (FRA)', '01 JAN 2030')
+    diff = diff_records(records(SPRINT, MILE), records(new_sprint, VAULT_A))
+    changes = dict(zip(diff['DISCIPLINE'], diff['CHANGE_TYPE']))
+    assert changes == {'100 Metres': 'changed', 'Mile Road': 'removed', 'Pole Vault': 'added'}
+
+    sprint = diff[diff['DISCIPLINE'] == '100 Metres'].iloc[0]
+    assert (sprint['COMPETITOR_before'], sprint['COMPETITOR_after']) == ('Usain BOLT', 'New ATHLETE')
+    assert sprint['PERF_VALUE_before'] == 9.58 and sprint['PERF_VALUE_after'] == 9.50
+    assert pd.isna(diff.loc[diff['DISCIPLINE'] == 'Mile Road', 'COMPETITOR_after']).all()
+    assert pd.isna(diff.loc[diff['DISCIPLINE'] == 'Pole Vault', 'COMPETITOR_before']).all()
+
+
+def test_tied_records_are_matched_by_occurrence():
+    diff = diff_records(records(SPRINT, VAULT_A), records(SPRINT, VAULT_A, VAULT_B))
+    assert diff[['DISCIPLINE', 'OCCURRENCE', 'CHANGE_TYPE', 'COMPETITOR_after']].values.tolist() == [
+        ['Pole Vault', 1, 'added', 'Someone ELSE']]
+
+
+def test_first_tied_record_removed():
+    # The record that left is the first one, the other one only moved up
+    diff = diff_records(records(SPRINT, VAULT_A, VAULT_B), records(SPRINT, VAULT_B))
+    assert diff[['DISCIPLINE', 'OCCURRENCE', 'CHANGE_TYPE', 'COMPETITOR_before']].values.tolist() == [
+        ['Pole Vault', 0, 'removed', 'Yelena ISINBAYEVA']]
+
+
+def test_first_tied_record_replaced():
+    new_vault = ('Pole Vault', '5.07', 'New ATHLETE', '01 JAN 2000', 'FRA', 'Paris (FRA)', '01 JAN 2030')
+    diff = diff_records(records(VAULT_A, VAULT_B), records(new_vault, VAULT_B))
+    assert diff[['OCCURRENCE', 'CHANGE_TYPE', 'COMPETITOR_before', 'COMPETITOR_after']].values.tolist() == [
+        [0, 'changed', 'Yelena ISINBAYEVA', 'New ATHLETE']]
+
+
+def test_reordered_tie_is_no_change():
+    assert diff_records(records(VAULT_A, VAULT_B), records(VAULT_B, VAULT_A)).empty
+
+
+def test_several_pairs_of_tables_in_one_call():
+    before = pd.concat([records(SPRINT).assign(PAIR=0), records(SPRINT).assign(PAIR=1)], ignore_index=True)
+    after = pd.concat([records(SPRINT).assign(PAIR=0), records(MILE).assign(PAIR=1)], ignore_index=True)
+    diff = diff_records(before, after, by=['PAIR'])
+    assert sorted(zip(diff['PAIR'], diff['DISCIPLINE'], diff['CHANGE_TYPE'])) == [
+        (1, '100 Metres', 'removed'), (1, 'Mile Road', 'added')]
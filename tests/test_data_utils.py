@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from data_utils import TWEET_MAX_LENGTH, record_keys, render_fields, render_text, render_threads, tweet_length, twitter_message
+
+
+def diff_rows(*rows):
+    columns = ['SEX', 'CATEGORY', 'DISCIPLINE', 'CHANGE_TYPE']
+    for when in ('before', 'after'):
+        columns += [f'{column}_{when}' for column in ('PERF', 'COMPETITOR', 'COUNTRY', 'VENUE', 'DATE')]
+    df = pd.DataFrame([dict(zip(columns, row)) for row in rows], columns=columns)
+    df['IMPROVEMENT'] = [improvement(row) for row in df.itertuples()]
+    return df
+
+
+def improvement(row):
+    if row.CHANGE_TYPE != 'changed':
+        return np.nan
+    return round(float(row.PERF_before) - float(row.PERF_after), 6)
+
+
+NEW_RECORD = ('men', 'world', '100 Metres', 'changed', '9.69', 'Usain BOLT', 'JAM', 'Beijing (CHN)', '16 AUG 2008',
+              '9.58', 'Usain BOLT', 'JAM', 'Berlin (GER)', '16 AUG 2009')
+REMOVED = ('men', 'world', 'Mile Road', 'removed', '3:43.13', 'Hicham EL GUERROUJ', 'MAR', 'Roma (ITA)', '07 JUL 1999',
+           np.nan, np.nan, np.nan, np.nan, np.nan)
+
+
+def test_record_keys_use_the_new_record():
+    assert record_keys(diff_rows(NEW_RECORD)) == ['men|world|100 Metres|9.58|Usain BOLT|16 AUG 2009']
+
+
+def test_record_keys_of_removed_records_use_the_removed_values():
+    other = REMOVED[:4] + ('3:44.00', 'Someone ELSE') + REMOVED[6:]
+    keys = record_keys(diff_rows(REMOVED, other))
+    assert keys[0] == 'removed|men|world|Mile Road|3:43.13|Hicham EL GUERROUJ|07 JUL 1999'
+    assert keys[0] != keys[1]
+
+
+def test_record_keys_of_no_change():
+    assert record_keys(diff_rows()) == []
+
+
+CORRECTION = NEW_RECORD[:9] + ('9.69', 'Usain BOLT', 'JAM', 'Beijing (CHN)', '17 AUG 2008')
+
+
+def test_templates_follow_the_kind_of_change():
+    df = diff_rows(NEW_RECORD, REMOVED, CORRECTION)
+    assert render_fields(df)['kind'].tolist() == ['record', 'removal', 'correction']
+    record, removal, correction = twitter_message(df)
+    assert record.startswith('🚨 New 100 Metres men world Record Alert!') and 'Previous record: Usain BOLT' in record
+    assert removal.startswith('❌ Mile Road men world Record Removed') and 'Hicham EL GUERROUJ (🇲🇦) - 3:43.13' in removal
+    assert '()' not in removal and 'shatters' not in removal
+    assert correction.startswith('📝 100 Metres men world Record Updated') and 'shatters' not in correction
+
+
+def test_threads_follow_the_kind_of_change():
+    (removal,), = render_threads(render_fields(diff_rows(REMOVED)))
+    assert removal.startswith('❌ Mile Road men world Record Removed')
+
+
+def long_record(venue_length, competitor_length=10):
+    return NEW_RECORD[:4] + ('9.69', 'B' * competitor_length, 'JAM', 'V' * venue_length, '16 AUG 2008',
+                             '9.58', 'A' * competitor_length, 'JAM', 'W' * venue_length, '16 AUG 2009')
+
+
+def test_tweet_length_counts_emojis_twice():
+    assert tweet_length('abc') == 3 and tweet_length('🏆') == 2 and tweet_length('Zürich – “Ω”') == 12
+
+
+def test_render_text_shortens_long_messages_step_by_step():
+    short, medium, long, huge = render_text(render_fields(diff_rows(
+        long_record(10), long_record(60), long_record(90), long_record(300, competitor_length=300))))
+    assert 'in VVVVVVVVVV' in short and 'in WWWWWWWWWW' in short
+    # The venue of the previous record goes first, then every venue, then the previous record
+    assert 'in V' not in medium and 'in W' in medium and 'Previous record' in medium
+    assert 'in W' not in long and 'Previous record' in long
+    assert 'Previous record' not in huge and huge.endswith('…')
+    assert all(tweet_length(message) <= TWEET_MAX_LENGTH for message in (short, medium, long, huge))
+
+
+def test_render_text_keeps_every_message_within_the_limit():
+    df = diff_rows(*(long_record(length, competitor_length=length // 3) for length in range(0, 400, 7)), REMOVED, CORRECTION)
+    assert all(tweet_length(message) <= TWEET_MAX_LENGTH for message in render_text(render_fields(df)))
@@ -0,0 +1,48 @@
+import os
+
+from file_operations import changed_files, sync_folders, write_manifest
+
+
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_sync_moves_after_into_before(tmp_path):
+    before, after = tmp_path / 'before', tmp_path / 'after'
+    before.mkdir()
+    after.mkdir()
+    write(before / 'README.md', 'before')
+    write(before / 'men_world_records.csv', 'old')
+    write(after / 'README.md', 'after')
+    write(after / 'men_world_records.csv', 'new')
+    write_manifest(str(after))
+
+    sync_folders(str(before), str(after))
+
+    assert sorted(os.listdir(before)) == ['README.md', 'manifest.json', 'men_world_records.csv']
+    assert (before / 'README.md').read_text() == 'before' and (before / 'men_world_records.csv').read_text() == 'new'
+    assert os.listdir(after) == ['README.md']
+    assert os.stat(before / 'men_world_records.csv').st_nlink == 1
+
+
+def test_changed_files_compares_manifests(tmp_path):
+    before, after = tmp_path / 'before', tmp_path / 'after'
+    for folder, content in ((before, 'old'), (after, 'new')):
+        folder.mkdir()
+        write(folder / 'men_world_records.csv', content)
+        write(folder / 'women_world_records.csv', 'same')
+        write_manifest(str(folder))
+    assert changed_files(str(before), str(after)) == {'men_world_records.csv'}
+
+
+def test_nothing_changed_or_synced_after_a_sync(tmp_path):
+    before, after = tmp_path / 'before', tmp_path / 'after'
+    before.mkdir()
+    after.mkdir()
+    write(before / 'men_world_records.csv', 'old')
+    write(after / 'README.md', 'after')
+
+    assert changed_files(str(before), str(after)) == set()
+    sync_folders(str(before), str(after))
+    assert (before / 'men_world_records.csv').read_text() == 'old'
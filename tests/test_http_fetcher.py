@@ -0,0 +1,26 @@
+import pytest
+import requests
+
+from conftest import read_fixture
+from http_fetcher import create_session, fetch_page, fetch_page_if_modified
+
+
+def test_fetch_page(fixture_server):
+    with create_session() as session:
+        assert fetch_page(session, f'{fixture_server.base_url}world-records') == read_fixture('world_records.html')
+
+
+def test_error_status_raises(fixture_server):
+    with create_session() as session, pytest.raises(requests.HTTPError):
+        fetch_page(session, f'{fixture_server.base_url}missing-records')
+
+
+def test_unchanged_page_is_not_downloaded_again(fixture_server):
+    url = f'{fixture_server.base_url}world-records'
+    with create_session() as session:
+        content, etag, _ = fetch_page_if_modified(session, url)
+        assert content == read_fixture('world_records.html') and etag
+        assert fetch_page_if_modified(session, url, etag) == (None, etag, None)
+        content, _, _ = fetch_page_if_modified(session, url, '"stale"')
+        assert content == read_fixture('world_records.html')
+    assert [status for _, status in fixture_server.statuses] == [200, 304, 200]
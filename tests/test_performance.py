@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from performance import add_improvement, discipline_direction, perf_values
+
+
+def test_perf_values_converts_times_distances_and_scores():
+    perf = pd.Series(['9.58', '1:43.98', '2:00:35', '8.95', '8521', '6.26!', 'DNF', None])
+    values = perf_values(perf)
+    assert values[:6] == pytest.approx([9.58, 103.98, 7235, 8.95, 8521, 6.26])
+    assert np.isnan(values[6:]).all()
+
+
+def test_perf_values_of_no_performance():
+    assert perf_values(pd.Series([], dtype=object)).shape == (0,)
+
+
+@pytest.mark.parametrize('discipline, expected', [('100 Metres', ('seconds', True)), ('Pole Vault', ('metres', False)),
+                                                  ('Decathlon', ('points', False)), ('Marathon', ('seconds', True))])
+def test_discipline_direction(discipline, expected):
+    assert discipline_direction(discipline) == expected
+
+
+def test_improvement_is_positive_for_a_better_record():
+    diff = pd.DataFrame({'DISCIPLINE': ['100 Metres', 'Pole Vault', '100 Metres', 'Mile Road'],
+                         'PERF_VALUE_before': [9.69, 6.21, 9.58, 223.13], 'PERF_VALUE_after': [9.58, 6.26, 9.58, np.nan]})
+    improvement = add_improvement(diff)['IMPROVEMENT']
+    assert improvement[:3].tolist() == pytest.approx([0.11, 0.05, 0.0])
+    assert np.isnan(improvement[3])
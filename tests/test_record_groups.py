@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from record_groups import group_changes
+
+
+def change(category, competitor='Usain BOLT', date='16 AUG 2009', change_type='changed', discipline='100 Metres'):
+    removed = change_type == 'removed'
+    return {'SEX': 'men', 'CATEGORY': category, 'DISCIPLINE': discipline, 'CHANGE_TYPE': change_type,
+            'PERF_before': '9.69', 'COMPETITOR_before': 'Someone ELSE', 'DATE_before': '01 JAN 2008',
+            'PERF_after': np.nan if removed else '9.58', 'COMPETITOR_after': np.nan if removed else competitor,
+            'DATE_after': np.nan if removed else date}
+
+
+def test_changes_of_a_performance_make_one_event():
+    df = pd.DataFrame([change('olympic_games'), change('world'), change('african', competitor='Other ATHLETE'), change('european')])
+    events = group_changes(df)
+    assert events['CATEGORY'].tolist() == ['world', 'african']
+    assert events['CATEGORIES'].tolist() == ['WR + AR + OR', '']
+
+
+def test_label_only_holds_the_changed_categories():
+    events = group_changes(pd.DataFrame([change('world')]))
+    assert events['CATEGORIES'].tolist() == ['']
+
+
+def test_removed_records_are_never_grouped():
+    df = pd.DataFrame([change('world', change_type='removed'), change('european', change_type='removed')])
+    events = group_changes(df)
+    assert events['CATEGORY'].tolist() == ['world', 'european']
+    assert events['CATEGORIES'].tolist() == ['', '']
+
+
+def test_no_change():
+    events = group_changes(pd.DataFrame([change('world')]).iloc[:0])
+    assert events.empty and 'CATEGORIES' in events
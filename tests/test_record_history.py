@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pandas as pd
+
+from data_analysis import generate_diff_dataframes
+from file_operations import write_manifest
+from record_history import append_changes, state_as_of
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def snapshots(tmp_path, edit_before, edit_after):
+    """
+    Copies data/data_before to a 'before' and an 'after' folder, edits the men's world records of each and writes their manifests.
+    """
+    before, after = tmp_path / 'before', tmp_path / 'after'
+    for folder, edit in ((before, edit_before), (after, edit_after)):
+        shutil.copytree(os.path.join(ROOT, 'data', 'data_before'), folder)
+        path = folder / 'men_world_records.csv'
+        edit(pd.read_csv(path)).to_csv(path, index=False)
+        write_manifest(str(folder))
+    return before, after
+
+
+def run_and_rebuild(tmp_path, before, after):
+    history = tmp_path / 'history'
+    append_changes(generate_diff_dataframes(str(before), str(after)), str(after), str(history), before_folder=str(before))
+    return state_as_of('2100-01-01', str(history))
+
+
+def expected(folder):
+    return pd.read_csv(folder / 'men_world_records.csv', dtype=str, keep_default_na=False)
+
+
+def test_history_starts_from_the_given_before_folder(tmp_path):
+    def rename(records):
+        # A record that differs from the repository's data/data_before, unchanged by the run
+        records.loc[0, 'COMPETITOR'] = 'Test ATHLETE'
+        return records
+
+    def new_record(records):
+        records.loc[2, ['PERF', 'DATE']] = ['9.50', '01 JAN 2030']
+        return rename(records)
+
+    before, after = snapshots(tmp_path, rename, new_record)
+    state = run_and_rebuild(tmp_path, before, after)
+    assert state['men_world'].fillna('').astype(str).equals(expected(after))
+    assert len(state) == 16
+
+
+def test_history_removes_the_tied_record_that_left(tmp_path):
+    def tie(records):
+        discus = records[records['DISCIPLINE'] == 'Discus Throw'].iloc[[0]].assign(COMPETITOR='First TIED', PERF='74.35')
+        position = records.index[records['DISCIPLINE'] == 'Discus Throw'][0]
+        return pd.concat([records.iloc[:position], discus, records.iloc[position:]], ignore_index=True)
+
+    before, after = snapshots(tmp_path, tie, lambda records: records)
+    state = run_and_rebuild(tmp_path, before, after)
+    assert state['men_world'].fillna('').astype(str).equals(expected(after))
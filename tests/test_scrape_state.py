@@ -0,0 +1,112 @@
+import os
+import queue
+import time
+
+from conftest import read_fixture
+from scrape_state import PageCache, ScrapeCheckpoint
+from web_scraping import scrape_worker
+
+URL = 'https://worldathletics.org/records/by-category/world-records'
+
+
+def test_cached_page_round_trip(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages'))
+    assert cache.get(URL, 'women') == (None, None)
+
+    cache.put(URL, 'women', 'Zürich – 🏆', 'http', '"v1"', 'Sat, 17 Oct 2026 00:00:00 GMT')
+    content, metadata = cache.get(URL, 'women')
+    assert content == 'Zürich – 🏆'
+    assert metadata['backend'] == 'http' and metadata['etag'] == '"v1"'
+    assert metadata['last_modified'] == 'Sat, 17 Oct 2026 00:00:00 GMT'
+    # The pages of both sexes share a URL but not a cache entry
+    assert cache.get(URL, 'men') == (None, None)
+
+
+def test_touch_only_refreshes_the_fetch_time(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages'))
+    cache.put(URL, 'women', 'page', 'http', '"v1"')
+    _, metadata = cache.get(URL, 'women')
+    cache.touch(URL, 'women', metadata)
+
+    content, touched = cache.get(URL, 'women')
+    assert content == 'page' and touched['etag'] == '"v1"'
+    assert touched['fetched_at'] >= metadata['fetched_at']
+
+
+def test_truncated_cache_entry_is_a_miss(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages'))
+    cache.put(URL, 'women', 'page', 'selenium')
+    path = cache._path(URL, 'women')
+    with open(f'{path}.html.gz', 'r+b') as f:
+        f.truncate(10)
+    assert cache.get(URL, 'women') == (None, None)
+
+
+def write_csv(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+def test_checkpoint_trusts_a_recent_unmodified_file(tmp_path):
+    csv_name = write_csv(tmp_path / 'data' / 'women_world_records.csv', 'DISCIPLINE\n')
+    checkpoint = ScrapeCheckpoint(str(tmp_path / 'checkpoint.json'))
+    assert not checkpoint.is_fresh(csv_name, 3600)
+
+    checkpoint.mark(csv_name, URL, 'women')
+    assert checkpoint.is_fresh(csv_name, 3600)
+    # The checkpoint is saved, so a new run trusts the file too
+    assert ScrapeCheckpoint(str(tmp_path / 'checkpoint.json')).is_fresh(csv_name, 3600)
+
+
+def test_checkpoint_rejects_stale_modified_or_missing_files(tmp_path):
+    checkpoint = ScrapeCheckpoint(str(tmp_path / 'checkpoint.json'))
+    stale, modified, missing = (write_csv(tmp_path / f'{name}.csv', 'DISCIPLINE\n') for name in ('stale', 'modified', 'missing'))
+    for csv_name in (stale, modified, missing):
+        checkpoint.mark(csv_name, URL, 'women')
+    checkpoint.entries[stale]['completed_at'] = time.time() - 7200
+    write_csv(tmp_path / 'modified.csv', 'DISCIPLINE\n100 Metres\n')
+    os.remove(missing)
+
+    assert [checkpoint.is_fresh(csv_name, 3600) for csv_name in (stale, modified, missing)] == [False, False, False]
+
+
+def test_corrupt_checkpoint_starts_empty(tmp_path):
+    (tmp_path / 'checkpoint.json').write_text('{"data/data_after/women_')
+    assert ScrapeCheckpoint(str(tmp_path / 'checkpoint.json')).entries == {}
+
+
+def run_worker(cache, checkpoint, max_age):
+    jobs, failed = queue.Queue(), []
+    jobs.put(('world-records', 'world_records', 'women', 1))
+    # No session nor browser can be used: a page that is neither skipped nor cached fails
+    scrape_worker(jobs, failed, backend='selenium', base_url='https://worldathletics.org/records/by-category/',
+                  max_age=max_age, cache=cache, checkpoint=checkpoint)
+    return failed
+
+
+def no_browser():
+    raise RuntimeError('Chrome is not available')
+
+
+def test_rerun_skips_completed_pages_and_reuses_cached_ones(tmp_path, monkeypatch):
+    (tmp_path / 'data' / 'data_after').mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('web_scraping.start_chrome', no_browser)
+    csv_name = 'data/data_after/women_world_records.csv'
+    cache, checkpoint = PageCache('cache'), ScrapeCheckpoint('checkpoint.json')
+    cache.put(URL, 'women', read_fixture('world_records.html'), 'selenium')
+
+    # A fresh cached page is parsed without a browser, and its CSV file marked as completed
+    assert run_worker(cache, checkpoint, 3600) == []
+    assert (tmp_path / csv_name).read_bytes() == read_fixture('women_world_records.csv', 'rb')
+    assert checkpoint.is_fresh(csv_name, 3600)
+
+    # A rerun skips the completed page, even once its cached page is gone
+    os.remove(f"{cache._path(URL, 'women')}.json")
+    mtime = os.stat(csv_name).st_mtime_ns
+    assert run_worker(cache, checkpoint, 3600) == []
+    assert os.stat(csv_name).st_mtime_ns == mtime
+
+    # With max_age=0, nothing is reused and the page has to be scraped again
+    assert run_worker(cache, checkpoint, 0) == [('world-records', 'women')]
@@ -0,0 +1,108 @@
+import json
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+import tweepy
+
+import tweet_queue
+from tweet_queue import TokenBucket, TweetDispatcher
+from tweet_store import TweetStore
+
+
+class FakeEndpoint(BaseAdapter):
+    """
+    Transport adapter answering the requests of a tweepy.Client with canned (status, headers) responses, in order.
+    """
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        body = {'data': {'id': str(len(self.requests)), 'text': ''}} if status == 201 else {'title': 'error', 'detail': 'error'}
+        response._content = json.dumps(body).encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(tweet_queue.time, 'sleep', sleeps.append)
+
+    def make(responses):
+        client = tweepy.Client(consumer_key='key', consumer_secret='secret', access_token='token', access_token_secret='secret')
+        endpoint = FakeEndpoint(responses)
+        client.session.mount('https://api.twitter.com', endpoint)
+        store = TweetStore(str(tmp_path / 'tweets.db'), str(tmp_path / 'memory.npy'))
+        return TweetDispatcher(client, None, store, TokenBucket(rate=1000, capacity=10)), endpoint, sleeps
+    return make
+
+
+def test_posts_and_records_message(dispatcher):
+    queue, endpoint, _ = dispatcher([(201, {})])
+    with queue:
+        queue.submit('New record', 'key')
+    assert queue.posted == ['1'] and queue.failed == []
+    assert queue.store.was_announced('key')
+
+
+def test_retries_after_too_many_requests(dispatcher):
+    queue, endpoint, sleeps = dispatcher([(429, {}), (201, {})])
+    with queue:
+        queue.submit('New record')
+    assert queue.posted == ['2'] and len(endpoint.requests) == 2
+    assert sleeps == [tweet_queue.BACKOFF_BASE ** 0]
+
+
+def test_retries_server_errors_then_fails(dispatcher):
+    queue, endpoint, sleeps = dispatcher([(503, {})] * tweet_queue.MAX_RETRIES)
+    with queue:
+        queue.submit('New record')
+    assert queue.posted == [] and queue.failed == ['New record']
+    assert len(endpoint.requests) == tweet_queue.MAX_RETRIES
+
+
+def test_fails_when_rate_limit_reset_is_too_far(dispatcher):
+    reset = {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(time.time() + 10 * tweet_queue.MAX_WAIT)}
+    queue, endpoint, sleeps = dispatcher([(429, reset)])
+    with queue:
+        queue.submit('New record')
+    assert queue.failed == ['New record'] and len(endpoint.requests) == 1
+    assert sleeps == []
+
+
+def test_keeps_draining_after_unexpected_error(dispatcher):
+    queue, endpoint, _ = dispatcher([(201, {})])
+    with queue:
+        queue.submit(None)
+        queue.submit('New record')
+    assert len(queue.failed) == 1 and queue.posted == ['1']
+
+
+def test_skips_message_already_posted(dispatcher):
+    queue, endpoint, _ = dispatcher([(201, {})])
+    with queue:
+        queue.submit('New record')
+        queue.submit('New record')
+    assert queue.posted == ['1'] and len(endpoint.requests) == 1
+
+
+def test_announces_a_record_once(dispatcher):
+    queue, endpoint, _ = dispatcher([(201, {})])
+    with queue:
+        queue.submit('New record', 'key')
+        queue.submit('New record, reworded', 'key')
+    assert queue.posted == ['1'] and len(endpoint.requests) == 1
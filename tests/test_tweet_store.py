@@ -0,0 +1,38 @@
+import numpy as np
+
+from tweet_store import TweetStore, message_hash
+
+
+def test_legacy_memory_is_migrated_once(tmp_path):
+    legacy = tmp_path / 'memory.npy'
+    np.save(legacy, np.array([1790000000000000001, 1790000000000000002]))
+    path = str(tmp_path / 'tweets.db')
+
+    store = TweetStore(path, str(legacy))
+    assert len(store) == 2
+    store.close()
+
+    # A second open must not import the IDs again, even if the legacy file changed
+    np.save(legacy, np.array([1790000000000000003]))
+    store = TweetStore(path, str(legacy))
+    assert len(store) == 2
+    store.close()
+
+
+def test_store_without_legacy_memory(tmp_path):
+    store = TweetStore(str(tmp_path / 'tweets.db'), str(tmp_path / 'memory.npy'))
+    assert len(store) == 0
+    store.close()
+
+
+def test_posted_tweets_are_found_by_message_and_record(tmp_path):
+    path = str(tmp_path / 'tweets.db')
+    store = TweetStore(path, str(tmp_path / 'memory.npy'))
+    store.add('42', message_hash('New record'), 'men|world|100 Metres')
+    store.close()
+
+    store = TweetStore(path, str(tmp_path / 'memory.npy'))
+    assert store.tweet_for_message(message_hash('New record')) == '42'
+    assert message_hash('Another record') not in store
+    assert store.was_announced('men|world|100 Metres') and not store.was_announced('men|world|200 Metres')
+    store.close()
@@ -0,0 +1,123 @@
+import os
+import queue
+
+import pytest
+
+import web_scraping
+from conftest import read_fixture
+from scrape_state import PageCache
+from web_scraping import MAX_RETRIES, scrape_worker
+
+
+class FakeDriver:
+    """
+    Selenium WebDriver stand-in whose page loads fail.
+    """
+
+    def __init__(self, number):
+        self.session_id = f'session-{number}'
+        self.quit_calls = 0
+
+    def get(self, url):
+        raise RuntimeError('browser crashed')
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / 'data' / 'data_after').mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def jobs_of(*pages):
+    jobs = queue.Queue()
+    for category, sex in pages:
+        jobs.put((category, category.replace('-', '_'), sex, 1))
+    return jobs
+
+
+def test_failed_job_restarts_the_browser(workdir, monkeypatch):
+    drivers = []
+    monkeypatch.setattr(web_scraping, 'start_chrome', lambda: drivers.append(FakeDriver(len(drivers))) or drivers[-1])
+    failed = []
+    scrape_worker(jobs_of(('world-records', 'women'), ('asian-records', 'men')), failed, backend='selenium')
+
+    assert sorted(failed) == [('asian-records', 'men'), ('world-records', 'women')]
+    # One browser per attempt, each quit once
+    assert len(drivers) == 2 * MAX_RETRIES
+    assert all(driver.quit_calls == 1 for driver in drivers)
+
+
+class FixtureDriver:
+    """
+    Selenium WebDriver stand-in rendering the saved pages: the women's table on load, the men's one once its tab is clicked.
+    """
+
+    def __init__(self):
+        self.session_id = 'fixture-session'
+        self.urls = []
+        self.page_source = None
+
+    def get(self, url):
+        self.urls.append(url)
+        self.page_source = read_fixture('world_records.html')
+
+    def click_men_tab(self):
+        self.page_source = read_fixture('men_world_records.html')
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def browser(monkeypatch):
+    drivers = []
+    monkeypatch.setattr(web_scraping, 'start_chrome', lambda: drivers.append(FixtureDriver()) or drivers[-1])
+    monkeypatch.setattr(web_scraping, 'click_button', lambda driver, xpath: driver.click_men_tab())
+    return drivers
+
+
+def read_csv(workdir, sex, category):
+    return (workdir / 'data' / 'data_after' / f"{sex}_{category.replace('-', '_')}.csv").read_bytes()
+
+
+def test_http_backend_fetches_the_women_pages_without_a_browser(workdir, browser, fixture_server):
+    failed = []
+    scrape_worker(jobs_of(('world-records', 'women')), failed, backend='http', base_url=fixture_server.base_url,
+                  cache=PageCache(str(workdir / 'cache')))
+
+    assert failed == [] and browser == []
+    assert fixture_server.statuses == [('/world-records', 200)]
+    assert read_csv(workdir, 'women', 'world-records') == read_fixture('women_world_records.csv', 'rb')
+
+
+def test_unchanged_page_is_reused_from_the_cache(workdir, browser, fixture_server):
+    cache = PageCache(str(workdir / 'cache'))
+    url = f'{fixture_server.base_url}world-records'
+    scrape_worker(jobs_of(('world-records', 'women')), [], base_url=fixture_server.base_url, cache=cache)
+    fetched_at = cache.get(url, 'women')[1]['fetched_at']
+    os.remove(workdir / 'data' / 'data_after' / 'women_world_records.csv')
+
+    # With max_age=0 the cached page is stale, so it is revalidated with its ETag
+    scrape_worker(jobs_of(('world-records', 'women')), [], base_url=fixture_server.base_url, cache=cache)
+
+    assert fixture_server.statuses == [('/world-records', 200), ('/world-records', 304)]
+    assert cache.get(url, 'women')[1]['fetched_at'] > fetched_at
+    assert read_csv(workdir, 'women', 'world-records') == read_fixture('women_world_records.csv', 'rb')
+
+
+def test_failed_fetch_and_men_pages_go_through_selenium(workdir, browser, fixture_server):
+    failed = []
+    scrape_worker(jobs_of(('asian-records', 'women'), ('world-records', 'men')), failed, backend='http',
+                  base_url=fixture_server.base_url)
+
+    assert failed == []
+    # The men's page is never fetched over HTTP, and one browser renders both pages
+    assert fixture_server.statuses == [('/asian-records', 404)]
+    assert len(browser) == 1
+    assert browser[0].urls == [f'{fixture_server.base_url}asian-records', f'{fixture_server.base_url}world-records']
+    assert read_csv(workdir, 'women', 'asian-records') == read_fixture('women_world_records.csv', 'rb')
+    assert read_csv(workdir, 'men', 'world-records') == read_fixture('men_world_records.csv', 'rb')
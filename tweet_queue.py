@@ -0,0 +1,206 @@
+"""
+This module provides a rate-limit-aware dispatch queue for the tweets of the World Athletics Records project.
+
+Messages are submitted to a TweetDispatcher, which posts them from a background thread with twitter_utils.post_tweet. Posting is
+paced by a token bucket, which is resynchronized with the rate-limit budget reported by the API in the 'x-rate-limit-remaining' and
+'x-rate-limit-reset' headers of every response: when the budget is exhausted, the dispatcher waits for the reset instead of failing,
+unless the reset is more than MAX_WAIT seconds away, in which case the message fails. Rate-limited and server errors are retried
+with exponential backoff. A message that fails for any other reason is logged and recorded as failed, and the queue keeps draining.
+
+Every delivery is committed to the tweet store (see tweet_store), keyed by the SHA-256 of the message and by the key of the
+record it announces, as soon as it happens, so a run that fails midway can be restarted without posting the same message twice.
+Both keys are checked and recorded by the background thread only, so two messages announcing the same record in one run are
+never both posted.
+
+Usage against a local fake endpoint:
+    TWITTER_API_URL=http://localhost:8000 python bot.py
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+import logging
+import queue
+import threading
+import time
+
+import tweepy
+
+from instrumentation import span
+from tweet_store import TweetStore, message_hash
+from twitter_utils import post_tweet
+
+############################################################################################################
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0
+# Longest wait for a token (e.g. for the reset of an exhausted rate-limit window), in seconds
+MAX_WAIT = 900.0
+
+############################################################################################################
+
+class TokenBucket:
+    """
+    Token bucket pacing the requests, kept in sync with the rate-limit budget reported by the API.
+
+    Parameters:
+        - rate (float): Tokens added per second while no budget is known.
+        - capacity (float): Maximum number of tokens, i.e. of requests sent in a burst.
+    """
+
+    def __init__(self, rate: float = 0.2, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.reset_at = None
+        self.lock = threading.Lock()
+
+    def update(self, remaining: int, reset: float) -> None:
+        """
+        Resynchronizes the bucket with the API budget: at most `remaining` requests until the epoch time `reset`.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens, remaining)
+            self.reset_at = time.monotonic() + max(0.0, reset - time.time()) if remaining == 0 else None
+
+    def acquire(self, max_wait: float = None) -> bool:
+        """
+        Blocks until a request may be sent, then consumes one token.
+
+        Parameters:
+            - max_wait (float): Longest acceptable wait in seconds, or None to wait as long as needed.
+
+        Returns:
+            - bool: True once a token was consumed, False without waiting if a token is not available within `max_wait`.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.reset_at is not None:
+                    if now < self.reset_at:
+                        wait = self.reset_at - now
+                    else:
+                        # The API window was reset: start again with a full bucket
+                        self.reset_at, self.tokens = None, self.capacity
+                        wait = 0
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    wait = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+                self.updated = now
+                if wait == 0:
+                    self.tokens -= 1
+                    return True
+                if max_wait is not None and wait > max_wait:
+                    return False
+            time.sleep(wait)
+
+
+class TweetDispatcher:
+    """
+    Posts submitted messages from a background thread, paced by a TokenBucket and recorded in a TweetStore.
+
+    Parameters:
+        - client (tweepy.Client): The client object for Twitter API v2.
+        - api (tweepy.API): The API object for Twitter API v1.1.
+        - store (TweetStore): The store of the posted tweets.
+        - bucket (TokenBucket): The rate limiter.
+
+    Attributes:
+        - posted (list): IDs of the tweets posted by this dispatcher.
+        - failed (list): Messages that could not be posted.
+    """
+
+    def __init__(self, client: tweepy.Client, api: tweepy.API, store: TweetStore = None, bucket: TokenBucket = None):
+        self.client = client
+        self.api = api
+        self.store = store if store is not None else TweetStore()
+        self.bucket = bucket if bucket is not None else TokenBucket()
+        self.posted = []
+        self.failed = []
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        client.session.hooks['response'].append(self._read_rate_limit)
+
+    def _read_rate_limit(self, response, *args, **kwargs):
+        remaining = response.headers.get('x-rate-limit-remaining')
+        reset = response.headers.get('x-rate-limit-reset')
+        if remaining is not None and reset is not None:
+            self.bucket.update(int(remaining), float(reset))
+
+    def submit(self, message: str, record_key: str = None, image_path: str = None) -> None:
+        """
+        Queues a message for posting. Messages already in the store, and messages about a record already announced, are skipped.
+        """
+        self.queue.put((message, record_key, image_path))
+
+    def start(self) -> 'TweetDispatcher':
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        """
+        Waits until every submitted message has been posted or has failed, then stops the background thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self._deliver(*item)
+            except Exception:
+                # One broken message must not stop the delivery of the others
+                logging.exception(f"Tweet not posted: {item[0]!r}")
+                self.failed.append(item[0])
+
+    def _deliver(self, message: str, record_key: str, image_path: str) -> None:
+        if record_key is not None and self.store.was_announced(record_key):
+            logging.info(f"Record {record_key} already announced, skipped.")
+            return
+        key = message_hash(message)
+        tweet_id = self.store.tweet_for_message(key)
+        if tweet_id is not None:
+            logging.info(f"Message {key[:12]} already posted as tweet {tweet_id}, skipped.")
+            return
+
+        with span('post', record=record_key, bytes=len(message.encode())) as stage:
+            for attempt in range(MAX_RETRIES):
+                stage.set(retries=attempt)
+                waited = time.perf_counter()
+                acquired = self.bucket.acquire(MAX_WAIT)
+                stage.add('rate_limit_wait_s', time.perf_counter() - waited)
+                if not acquired:
+                    logging.info(f"Rate limit not reset within {MAX_WAIT:.0f} s, tweet not posted.")
+                    break
+                try:
+                    response = post_tweet(self.client, self.api, message, image_path)
+                except tweepy.TooManyRequests as e:
+                    # With rate-limit headers, the bucket already waits for the reset of the window
+                    if 'x-rate-limit-reset' not in e.response.headers:
+                        time.sleep(BACKOFF_BASE ** attempt)
+                    logging.info("Rate limited, retrying.")
+                except tweepy.TwitterServerError as e:
+                    logging.info(f"Twitter server error ({e}), retrying in {BACKOFF_BASE ** attempt:.0f} s.")
+                    time.sleep(BACKOFF_BASE ** attempt)
+                except tweepy.HTTPException as e:
+                    logging.info(f"Tweet rejected, not retried. Reason: {e}")
+                    break
+                else:
+                    tweet_id = response.data['id']
+                    self.store.add(tweet_id, key, record_key)
+                    self.posted.append(tweet_id)
+                    stage.set(posted=1)
+                    return
+            stage.set(posted=0)
+            self.failed.append(message)
@@ -0,0 +1,135 @@
+"""
+This module provides the store of the tweets posted by the World Athletics Records project, replacing 'log/memory.npy'.
+
+Tweets are kept in an SQLite database ('log/tweets.db'), one row per posted tweet with its ID, the SHA-256 of its message, the key
+of the record it announces and the posting time. Each post is a single-row insert committed in its own transaction, and indexes
+on the message hash and the record key make "was this message posted" and "was this record already announced" B-tree lookups.
+The IDs of 'log/memory.npy' are imported once, the first time the store is opened. The connection is shared with the thread of
+the dispatcher (see tweet_queue), so every access to it is serialized by a lock.
+
+Functions:
+- message_hash(message): Returns the idempotency key of a message.
+
+Usage:
+    python tweet_store.py   # prints the number of stored tweets, migrating log/memory.npy if needed
+
+Author: LE GOURRIEREC Titouan
+"""
+
+############################################################################################################
+
+from datetime import datetime, timezone
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+from log_setup import setup_logging
+
+############################################################################################################
+
+TWEET_STORE = 'log/tweets.db'
+LEGACY_MEMORY = 'log/memory.npy'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,
+    tweet_id TEXT NOT NULL,
+    message_hash TEXT,
+    record_key TEXT,
+    posted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS tweets_message_hash ON tweets (message_hash);
+CREATE INDEX IF NOT EXISTS tweets_record_key ON tweets (record_key);
+CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at TEXT);
+"""
+
+############################################################################################################
+
+def message_hash(message: str) -> str:
+    """
+    Returns the idempotency key of a message: the SHA-256 hex digest of its text.
+    """
+    return hashlib.sha256(message.encode('utf-8')).hexdigest()
+
+
+class TweetStore:
+    """
+    Append-only SQLite store of the posted tweets.
+
+    Parameters:
+        - path (str): Path of the SQLite database.
+        - legacy_memory (str): Path of the 'memory.npy' file whose IDs are imported on first use.
+    """
+
+    def __init__(self, path: str = TWEET_STORE, legacy_memory: str = LEGACY_MEMORY):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.executescript(SCHEMA)
+        self._migrate_memory(legacy_memory)
+
+    def _migrate_memory(self, legacy_memory: str) -> None:
+        """
+        Imports the tweet IDs of the legacy 'memory.npy' file, once.
+        """
+        if self.connection.execute("SELECT 1 FROM migrations WHERE name = 'memory.npy'").fetchone() is not None:
+            return
+        tweet_ids = []
+        if os.path.exists(legacy_memory):
+            import numpy as np
+            tweet_ids = [str(tweet_id) for tweet_id in np.load(legacy_memory).tolist()]
+        with self.connection:
+            self.connection.executemany("INSERT INTO tweets (tweet_id) VALUES (?)", [(tweet_id,) for tweet_id in tweet_ids])
+            self.connection.execute("INSERT INTO migrations VALUES ('memory.npy', ?)", (_now(),))
+        logging.info(f"{len(tweet_ids)} tweet IDs migrated from {legacy_memory}.")
+
+    def add(self, tweet_id: str, message_hash: str = None, record_key: str = None) -> None:
+        """
+        Records a posted tweet. The row is committed before returning.
+
+        Parameters:
+            - tweet_id (str): The ID of the posted tweet.
+            - message_hash (str): The hash of the message (see message_hash).
+            - record_key (str): The key of the announced record (see data_utils.record_keys).
+        """
+        with self.lock, self.connection:
+            self.connection.execute("INSERT INTO tweets (tweet_id, message_hash, record_key, posted_at) VALUES (?, ?, ?, ?)",
+                                    (str(tweet_id), message_hash, record_key, _now()))
+
+    def tweet_for_message(self, message_hash: str) -> str:
+        """
+        Returns the ID of the tweet that posted a message, or None if it was never posted.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT tweet_id FROM tweets WHERE message_hash = ? LIMIT 1", (message_hash,)).fetchone()
+        return None if row is None else row[0]
+
+    def __contains__(self, message_hash: str) -> bool:
+        return self.tweet_for_message(message_hash) is not None
+
+    def was_announced(self, record_key: str) -> bool:
+        """
+        Returns whether a tweet was already posted about a record.
+        """
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM tweets WHERE record_key = ? LIMIT 1", (record_key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+if __name__ == "__main__":
+    setup_logging()
+    store = TweetStore()
+    print(f"{len(store)} tweets stored in {TWEET_STORE}.")
+    store.close()
@@ -3,8 +3,11 @@ This module provides utility functions for interacting with the Twitter API with
 It includes functions for authenticating with the Twitter API using Tweepy and for posting tweets, optionally with images.
 These functions facilitate the automated sharing of updates and insights derived from the analysis of athletics records data on Twitter.
 
+The Twitter API v2 host can be replaced by another base URL (argument or TWITTER_API_URL environment variable), e.g. a local fake
+endpoint, in which case the requests of the v2 client are redirected to it.
+
 Functions:
-- authenticate_twitter(): Authenticates a user with the Twitter API using Tweepy and returns a client for Twitter API v2 and an API object for Twitter API v1.1.
+- authenticate_twitter(api_url=None): Authenticates a user with the Twitter API using Tweepy and returns a client for Twitter API v2 and an API object for Twitter API v1.1.
 - post_tweet(client, api, message, image_path=None): Posts a tweet with an optional image using the authenticated Twitter API client and API objects.
 
 Author: LE GOURRIEREC Titouan
@@ -15,19 +18,40 @@ Author: LE GOURRIEREC Titouan
 import logging
 import os
 
+from requests.adapters import HTTPAdapter
 import tweepy
 
-logging.basicConfig(filename='log/log.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
+############################################################################################################
+
+TWITTER_API_HOST = "https://api.twitter.com"
 
 ############################################################################################################
 
-def authenticate_twitter() -> tuple[tweepy.Client, tweepy.API]:
+class RedirectAdapter(HTTPAdapter):
+    """
+    Transport adapter sending the requests made to the Twitter API host to another base URL.
+    """
+
+    def __init__(self, api_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.api_url = api_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        request.url = self.api_url + request.url[len(TWITTER_API_HOST):]
+        return super().send(request, **kwargs)
+
+
+def authenticate_twitter(api_url: str = None) -> tuple[tweepy.Client, tweepy.API]:
     """
     Authenticates a user with the Twitter API using Tweepy.
 
     This function retrieves API keys and access tokens from environment variables and uses them to authenticate with the Twitter API.
     It returns a Tweepy Client object for the Twitter API v2 and a Tweepy API object for the Twitter API v1.1.
 
+    Parameters:
+        - api_url (str): Base URL replacing the Twitter API host for the v2 client. Defaults to the TWITTER_API_URL environment
+          variable, if set.
+
     Returns:
         tuple: A tuple containing:
             - client (tweepy.Client): A client object for Twitter API v2.
@@ -43,6 +67,10 @@ def authenticate_twitter() -> tuple[tweepy.Client, tweepy.API]:
         consumer_key=API_KEY, consumer_secret=API_KEY_SECRET,
         access_token=ACCESS_TOKEN, access_token_secret=ACCESS_TOKEN_SECRET
     )
+    api_url = api_url or os.getenv("TWITTER_API_URL")
+    if api_url:
+        client.session.mount(TWITTER_API_HOST, RedirectAdapter(api_url))
+
     auth = tweepy.OAuth1UserHandler(API_KEY, API_KEY_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
     api = tweepy.API(auth)
     
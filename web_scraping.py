@@ -2,46 +2,116 @@
 Web Scraping Utility for Athletic Records
 
 This script contains functions for scraping athletic records from World Athletics web pages and saving the data to CSV files.
-It uses BeautifulSoup for parsing HTML content and Selenium for web page interaction.
+It parses HTML content with a streaming parser (see records_parser; BeautifulSoup remains available), and fetches the pages
+either over plain HTTP (see http_fetcher) or with Selenium. With the default 'http' backend, the women's pages, whose table is
+rendered by the server, are fetched without a browser and Selenium is only started when that fails. The men's table is only
+rendered once its tab is clicked, so the men's pages are always loaded with Selenium.
+
+The 16 record pages (8 categories x 2 sexes) are scraped by a pool of workers, each reusing one HTTP session and at most one
+headless Chrome instance, and pulling (category, sex) jobs from a shared queue. Failed jobs are put back on the queue and
+retried instead of aborting the run.
+
+Raw pages are kept in a compressed cache, CSV files are written atomically and a checkpoint lists the completed ones (see
+scrape_state), so a rerun after a failure only scrapes the pages that are missing or stale.
+
+Starting Chrome, loading each page, dismissing the cookie banner and parsing each table are measured as spans (see
+instrumentation), with the page size, the number of rows and the retries of each page.
 
 Author: LE GOURRIEREC Titouan
 """
 
 ############################################################################################################
 
-from datetime import datetime
+import argparse
 import logging
+import os
+import queue
+import threading
 import time
 
-from bs4 import BeautifulSoup
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+from file_operations import write_manifest
+from instrumentation import setup_metrics, span
+from log_setup import setup_logging
+from records_parser import TABLE_CLASS, parse_table_rows
+from scrape_state import PageCache, ScrapeCheckpoint
+
+# pandas, BeautifulSoup, Selenium, requests and pyarrow are imported by the functions that need them, so that a run that only
+# re-parses pages does not pay for loading them
+
+############################################################################################################
 
-logging.basicConfig(filename='log/log.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filemode='a')
+BASE_URL = "https://worldathletics.org/records/by-category/"
+MEN_BUTTON = '//*[@id="__next"]/div[3]/div/div/div[2]/ul/li[2]/button'
+CATEGORIES = [
+    ("world-records", "world_records"),
+    ("olympic-games-records", "olympic_games_records"),
+    ("african-records", "african_records"),
+    ("asian-records", "asian_records"),
+    ("european-records", "european_records"),
+    ("nacac-records", "nacac_records"),
+    ("oceanian-records", "oceanian_records"),
+    ("south-american-records", "south_american_records")
+]
+MAX_RETRIES = 3
+# A rerun within this many seconds reuses the pages already scraped (see scrape_state)
+DEFAULT_MAX_AGE = 12 * 3600
+
+# Session ids of the drivers for which the cookie banner has already been handled
+_cookie_sessions = set()
 
 ############################################################################################################
 ##############################           Web scraping functions           ##################################
 ############################################################################################################
 
-def create_csv(content : str, csv_name : str) -> None:
+def clean_perf(perf: str) -> str:
     """
-    Extracts athletic records from HTML and saves to a CSV.
+    Removes the annotation markers (*, Mx, Wo, h) from a performance.
+
+    Parameters:
+        - perf (str): The raw performance text.
+
+    Returns:
+        - str: The cleaned performance.
+    """
+    perf = perf.strip()
+    for r in ["*", "Mx", "Wo", "h"]:
+        perf = perf.replace(r, "")
+    return perf.strip()
+
+
+def table_rows_bs4(content: str) -> list:
+    """
+    Returns the text of every cell of the records table, using a full BeautifulSoup tree of the page.
 
     Parameters:
         - content (str): HTML content.
-        - csv_name (str): Output CSV file name.
+
+    Returns:
+        - list[list[str]]: One list of cell texts per table row.
     """
+    from bs4 import BeautifulSoup
 
     # Parse the page content with BeautifulSoup
     soup = BeautifulSoup(content, 'html.parser')
     # Find the table containing the records
-    table_body = soup.find(attrs={'class':'Table_table__2zsdR RecordsTable_table__3X8lL'}).find('tbody')
+    table_body = soup.find(attrs={'class': TABLE_CLASS}).find('tbody')
     # Find all table rows
-    rows = table_body.find_all('tr')
+    return [[cell.text for cell in row.find_all('td')] for row in table_body.find_all('tr')]
+
+
+def create_csv(content : str, csv_name : str, parser : str = "stream") -> None:
+    """
+    Extracts athletic records from HTML and saves to a CSV.
+
+    Parameters:
+        - content (str): HTML content.
+        - csv_name (str): Output CSV file name.
+        - parser (str): 'stream' to use the event-based parser of records_parser, which stops at the end of the records table
+          and never builds a DOM, or 'bs4' to use BeautifulSoup. Both produce identical CSVs.
+    """
+    with span('parse', parser=parser, bytes=len(content)) as s:
+        rows = parse_table_rows(content) if parser == "stream" else table_rows_bs4(content)
+        s.set(rows=len(rows))
 
     data = {
         'DISCIPLINE': [],
@@ -53,39 +123,66 @@ def create_csv(content : str, csv_name : str) -> None:
         'DATE': []
     }
 
-    for row in rows:
-        cells = row.find_all('td')
-        data['DISCIPLINE'].append(cells[0].text.strip())
-        
-        perf = cells[2].text.strip()
-        for r in ["*", "Mx", "Wo", "h"]:
-            perf = perf.replace(r, "")
-        data['PERF'].append(perf.strip())
-
-        data['COMPETITOR'].append(cells[4].text.strip())
-        data['DOB'].append(cells[5].text.strip())
-        data['COUNTRY'].append(cells[6].text.strip())
-        data['VENUE'].append(cells[7].text.strip().replace("(i)", ""))
-        data['DATE'].append(cells[8].text.strip())
+    for cells in rows:
+        data['DISCIPLINE'].append(cells[0].strip())
+
+        data['PERF'].append(clean_perf(cells[2]))
+
+        data['COMPETITOR'].append(cells[4].strip())
+        data['DOB'].append(cells[5].strip())
+        data['COUNTRY'].append(cells[6].strip())
+        data['VENUE'].append(cells[7].strip().replace("(i)", ""))
+        data['DATE'].append(cells[8].strip())
+
+    write_records(data, csv_name)
+
+
+def write_records(data: dict, csv_name: str) -> None:
+    """
+    Saves extracted athletic records to a CSV.
+
+    Parameters:
+        - data (dict): A mapping from column name to the list of column values.
+        - csv_name (str): Output CSV file name.
+    """
+    import pandas as pd
 
     records = pd.DataFrame(data)
-    records.to_csv(csv_name, index=False)
+    # Written next to the destination and renamed, so that an interrupted run never leaves a truncated CSV file
+    records.to_csv(f'{csv_name}.tmp', index=False)
+    os.replace(f'{csv_name}.tmp', csv_name)
 
 
 def dismiss_cookie_consent(driver):
-    try:
-        # Locate the cookie consent button by its ID or any other unique selector
-        consent_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowallSelection"))
-        )
-        consent_button.click()
-        logging.info("Cookie consent dismissed.")
-    except Exception as e:
-        # If the cookie consent dialog is not found, ignore the exception
-        logging.info(f"Cookie consent dialog not found or already dismissed.")
-
+    """
+    Dismisses the cookie consent banner, at most once per browser session.
 
-def click_button(driver: webdriver.Chrome, xpath: str) -> None:
+    Parameters:
+        - driver: The Selenium WebDriver instance used to interact with the webpage.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    if driver.session_id in _cookie_sessions:
+        return
+    _cookie_sessions.add(driver.session_id)
+    with span('cookie_dismissal') as s:
+        try:
+            # Locate the cookie consent button by its ID or any other unique selector
+            consent_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.ID, "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowallSelection"))
+            )
+            consent_button.click()
+            s.set(found=True)
+            logging.info("Cookie consent dismissed.")
+        except Exception as e:
+            # If the cookie consent dialog is not found, ignore the exception
+            s.set(found=False)
+            logging.info(f"Cookie consent dialog not found or already dismissed.")
+
+
+def click_button(driver: 'webdriver.Chrome', xpath: str) -> None:
     """
     Clicks a button identified by an XPath on a webpage using Selenium WebDriver.
 
@@ -94,9 +191,12 @@ def click_button(driver: webdriver.Chrome, xpath: str) -> None:
         - xpath (str): The XPath string used to locate the button on the webpage.
 
     Exceptions:
-        - Exception: Catches and prints any exception that occurs during the button click attempt, then quits the driver
-        and asserts False to indicate failure.
+        - Exception: Logs and re-raises any exception that occurs during the button click attempt so that the caller can retry.
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         # Call dismiss_cookie_consent before attempting to click the target button
         dismiss_cookie_consent(driver)
@@ -105,12 +205,12 @@ def click_button(driver: webdriver.Chrome, xpath: str) -> None:
         )
         button.click()
     except Exception as e:
-        print(f"Error during the click button: {e}")
-        driver.quit()
-        assert False
+        logging.info(f"Error during the click button: {e}")
+        raise
 
 
-def get_content_and_create_csv(driver: webdriver.Chrome, url: str, button_selector: str, csv_name: str) -> None:
+def get_content_and_create_csv(driver: 'webdriver.Chrome', url: str, button_selector: str, csv_name: str, sex: str = None,
+                               cache: PageCache = None) -> None:
     """
     Navigates to a URL, optionally clicks a button, and creates a CSV from the page content.
 
@@ -119,44 +219,217 @@ def get_content_and_create_csv(driver: webdriver.Chrome, url: str, button_select
         - url (str): The URL of the web page to navigate to.
         - button_selector (str): XPath selector for a button to click after loading the page. If None, no button is clicked.
         - csv_name (str): Name of the CSV file to be created with the content from the web page.
+        - sex (str): 'men' or 'women', the key of the page in the cache.
+        - cache (PageCache): Cache in which the page is saved, if any.
+    """
+    with span('page_load', url=url, backend='selenium') as s:
+        driver.get(url)
+        if button_selector:
+            click_button(driver, button_selector)
+        content = driver.page_source
+        s.set(bytes=len(content))
+    if cache is not None:
+        cache.put(url, sex, content, "selenium")
+    create_csv(content, csv_name)
+
+
+def fetch_and_create_csv(session, url: str, sex: str, csv_name: str, cache: PageCache = None) -> None:
+    """
+    Fetches a records page over plain HTTP, without a browser, and creates a CSV from it. The table of the page is the one
+    rendered by the server, i.e. the women's one.
+
+    When the page was cached by a previous HTTP fetch, the request is conditional on its ETag or Last-Modified date, and the
+    cached page is reused if the server reports it unchanged.
+
+    Parameters:
+        - session (requests.Session): The pooled HTTP session to use.
+        - url (str): The URL of the web page to fetch.
+        - sex (str): 'men' or 'women'.
+        - csv_name (str): Name of the CSV file to be created with the content from the web page.
+        - cache (PageCache): Cache of the pages, if any.
+
+    Exceptions:
+        - Exception: Any error while fetching or parsing the page, so that the caller can fall back to Selenium.
     """
-    driver.get(url)
-    if button_selector:
-        click_button(driver, button_selector)
-    content = driver.page_source
+    from http_fetcher import fetch_page_if_modified
+
+    content, metadata = cache.get(url, sex) if cache is not None else (None, None)
+    if metadata is not None and metadata['backend'] != "http":
+        content, metadata = None, None
+
+    with span('page_load', url=url, backend='http') as s:
+        fetched, etag, last_modified = fetch_page_if_modified(session, url, *(
+            (metadata['etag'], metadata['last_modified']) if metadata is not None else ()))
+        s.set(bytes=len(fetched or ''), not_modified=fetched is None)
+    if fetched is not None:
+        content = fetched
+        if cache is not None:
+            cache.put(url, sex, content, "http", etag, last_modified)
+    else:
+        cache.touch(url, sex, metadata)
     create_csv(content, csv_name)
 
 
+def start_chrome() -> 'webdriver.Chrome':
+    """
+    Starts a headless Chrome instance.
+
+    Returns:
+        - webdriver.Chrome: The Selenium WebDriver of the new instance.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    with span('driver_start'):
+        return webdriver.Chrome(options=chrome_options)
+
+
+def scrape_worker(jobs: queue.Queue, failed: list, backend: str = "http", base_url: str = BASE_URL, max_age: float = 0,
+                  cache: PageCache = None, checkpoint: ScrapeCheckpoint = None) -> None:
+    """
+    Scrapes record pages from a shared job queue with a single, reused HTTP session and browser instance.
+
+    Each job is a tuple (category, file_name, sex, attempt). A page whose CSV file the checkpoint reports as completed less than
+    `max_age` seconds ago is skipped, and a page cached less than `max_age` seconds ago is parsed from the cache. Otherwise, with
+    the 'http' backend, a women's page is first fetched without a browser, and Chrome is only started (once, then reused) when
+    that fails or for the men's pages. A job that raises is put back on the queue until it has been tried MAX_RETRIES times,
+    after which it is appended to `failed`. A job that fails while using Chrome quits it, so that a crashed or hung browser is
+    not reused by the next jobs.
+
+    Parameters:
+        - jobs (queue.Queue): The shared queue of jobs.
+        - failed (list): List collecting the jobs that could not be completed.
+        - backend (str): 'http' to try the browser-free fetch first, 'selenium' to always use Chrome.
+        - base_url (str): URL prefix of the records pages.
+        - max_age (float): Age, in seconds, under which a completed CSV file or a cached page is reused.
+        - cache (PageCache): Cache of the pages, if any.
+        - checkpoint (ScrapeCheckpoint): Checkpoint of the completed CSV files, if any.
+    """
+    session = None
+    if backend == "http":
+        from http_fetcher import create_session
+        session = create_session()
+    driver = None
+    try:
+        while True:
+            try:
+                category, file_name, sex, attempt = jobs.get_nowait()
+            except queue.Empty:
+                return
+
+            url = f"{base_url}{category}"
+            csv_name = f"data/data_after/{sex}_{file_name}.csv"
+            button_selector = MEN_BUTTON if sex == "men" else None
+            uses_driver = False
+            try:
+                if checkpoint is not None and checkpoint.is_fresh(csv_name, max_age):
+                    logging.info(f"File {csv_name} is up to date, skipped.")
+                    continue
+                with span('scrape_page', category=category, sex=sex, retries=attempt - 1) as s:
+                    source = None
+                    content, metadata = cache.get(url, sex) if cache is not None else (None, None)
+                    if metadata is not None and time.time() - metadata['fetched_at'] <= max_age:
+                        create_csv(content, csv_name)
+                        source = "cache"
+                    if source is None and session is not None and sex == "women":
+                        try:
+                            fetch_and_create_csv(session, url, sex, csv_name, cache)
+                            source = "http"
+                        except Exception as e:
+                            logging.info(f"HTTP fetch failed for {category} ({sex}), falling back to Selenium. Reason: {e}")
+                    if source is None:
+                        uses_driver = True
+                        if driver is None:
+                            driver = start_chrome()
+                        get_content_and_create_csv(driver, url, button_selector, csv_name, sex, cache)
+                        source = "selenium"
+                    s.set(source=source)
+                if checkpoint is not None:
+                    checkpoint.mark(csv_name, url, sex)
+                logging.info(f"File {csv_name} has been created successfully ({source}).")
+            except Exception as e:
+                logging.info(f"Failed to scrape {category} ({sex}), attempt {attempt}/{MAX_RETRIES}. Reason: {e}")
+                if uses_driver and driver is not None:
+                    # The browser may have crashed or hung: the next job starts a new one
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = None
+                if attempt < MAX_RETRIES:
+                    jobs.put((category, file_name, sex, attempt + 1))
+                else:
+                    failed.append((category, sex))
+            finally:
+                jobs.task_done()
+    finally:
+        if driver is not None:
+            driver.quit()
+        if session is not None:
+            session.close()
+
+
 ############################################################################################################
 #############################             Web scraping script             ##################################
 ############################################################################################################
 
-def main():
+def main(workers: int = None, backend: str = "http", base_url: str = BASE_URL, max_age: float = DEFAULT_MAX_AGE) -> None:
+    """
+    Scrapes every (category, sex) record page into data/data_after with a pool of workers.
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
+    The pages are cached in data/cache/pages and every completed CSV file is recorded in a checkpoint (see scrape_state), so a
+    rerun after a failure only scrapes the pages that are missing or older than `max_age`.
+
+    Parameters:
+        - workers (int): Number of concurrent workers (each with at most one Chrome instance). Defaults to the number of CPU cores.
+        - backend (str): 'http' to fetch pages without a browser and fall back to Selenium, 'selenium' to always use Chrome.
+        - base_url (str): URL prefix of the records pages, e.g. a local server serving saved pages.
+        - max_age (float): Age, in seconds, under which a completed CSV file or a cached page is reused (0 to scrape everything).
+
+    Exceptions:
+        - RuntimeError: If some pages could still not be scraped after MAX_RETRIES attempts.
+    """
+    from record_store import csv_to_store
+
+    jobs = queue.Queue()
+    for category, file_name in CATEGORIES:
+        for sex in ("women", "men"):
+            jobs.put((category, file_name, sex, 1))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, jobs.qsize()))
+    logging.info(f"Scraping {jobs.qsize()} pages with {workers} workers.")
 
-    categories = [
-        ("world-records", "world_records"),
-        ("olympic-games-records", "olympic_games_records"),
-        ("african-records", "african_records"),
-        ("asian-records", "asian_records"),
-        ("european-records", "european_records"),
-        ("nacac-records", "nacac_records"),
-        ("oceanian-records", "oceanian_records"),
-        ("south-american-records", "south_american_records")
-    ]
+    failed = []
+    cache = PageCache()
+    checkpoint = ScrapeCheckpoint()
+    threads = [threading.Thread(target=scrape_worker, args=(jobs, failed, backend, base_url, max_age, cache, checkpoint))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
-    men_button = '//*[@id="__next"]/div[3]/div/div/div[2]/ul/li[2]/button'
+    # Jobs left in the queue when every worker died (e.g. Chrome could not start)
+    while not jobs.empty():
+        category, _, sex, _ = jobs.get_nowait()
+        failed.append((category, sex))
 
-    with webdriver.Chrome(options=chrome_options) as driver:
-        for category, file_name in categories:
-            base_url = "https://worldathletics.org/records/by-category/"
-            logging.info(f"Processing category: {category}")
-            get_content_and_create_csv(driver, f"{base_url}{category}", None, f"data/data_after/women_{file_name}.csv")
-            get_content_and_create_csv(driver, f"{base_url}{category}", men_button, f"data/data_after/men_{file_name}.csv")
+    write_manifest("data/data_after")
+    csv_to_store("data/data_after")
 
-            logging.info(f"Files data/data_after/women_{file_name}.csv and data/data_after/men_{file_name}.csv have been created successfully.")
+    if failed:
+        raise RuntimeError(f"Failed to scrape {len(failed)} pages: {failed}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape World Athletics records into data/data_after.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of concurrent browser instances (default: number of cores).")
+    parser.add_argument("--backend", choices=["http", "selenium"], default="http", help="How pages are fetched (default: http, falling back to selenium).")
+    parser.add_argument("--base-url", default=BASE_URL, help="URL prefix of the records pages.")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE,
+                        help="Seconds under which a completed or cached page is not fetched again (default: 12 h, 0 to refetch all).")
+    args = parser.parse_args()
+    setup_logging()
+    setup_metrics()
+    main(args.workers, args.backend, args.base_url, args.max_age)